@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator
+from urllib.parse import urlsplit
+
+from src import cache
+from src.cache import negative_clear, wait_for_refreshes
+from src.circuit import reset_breakers
+from src.db import get_connection
+from src.snapshot import demo_countries
+
+APP_PATH = Path(__file__).resolve().parents[1] / "streamlit_app.py"
+ACTIONS = ("country", "page", "ttl", "chart_points")
+OWID_HEADER = "Entity,Code,Year,Prevalence of undernourishment (% of population)"
+
+
+def _series(key: str, years: range) -> list[tuple[int, float]]:
+    rng = random.Random(key)
+    return [(year, round(rng.uniform(0, 30), 2)) for year in years]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency_s = 0.0
+    years = range(2000, 2024)
+
+    def do_GET(self) -> None:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        path = urlsplit(self.path).path
+        parts = path.strip("/").split("/")
+        if path.endswith("undernourishment.csv"):
+            lines = [OWID_HEADER]
+            for iso3 in demo_countries():
+                lines.extend(f"{iso3},{iso3},{year},{value}" for year, value in _series(iso3, self.years))
+            self._send(200, "text/csv", "\n".join(lines).encode("utf-8"))
+        elif len(parts) == 5 and parts[1] == "country" and parts[3] == "indicator":
+            data = [{"date": str(year), "value": value} for year, value in _series(path, self.years)]
+            self._send(200, "application/json", json.dumps([{"page": 1}, data]).encode("utf-8"))
+        else:
+            self._send(404, "text/plain", b"not found")
+
+    def _send(self, status: int, content_type: str, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@contextmanager
+def stub_upstream(latency_ms: float = 0.0) -> Iterator[str]:
+    handler = type("Handler", (StubHandler,), {"latency_s": latency_ms / 1000})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, name="stub-upstream", daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextmanager
+def _environment(values: dict[str, str]) -> Iterator[None]:
+    previous = {k: os.environ.get(k) for k in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values), max(1, math.ceil(q / 100 * len(sorted_values)))) - 1
+    return sorted_values[rank]
+
+
+def _apply(at, action: str, rng: random.Random) -> None:
+    sidebar = at.sidebar
+    if action == "country":
+        widget = sidebar.selectbox[0]
+    elif action == "page":
+        widget = sidebar.radio[0]
+    elif action == "ttl":
+        sidebar.slider[0].set_value(rng.randint(1, 168))
+        return
+    else:
+        inputs = [w for w in sidebar.number_input if w.min == 50]
+        if inputs:
+            inputs[0].set_value(rng.choice([200, 500, 1000, 2000]))
+        return
+    widget.set_value(rng.choice(widget.options))
+
+
+def _errors(at) -> list[str]:
+    return [str(e.value if hasattr(e, "value") else e) for e in at.exception]
+
+
+def _session(index: int, iterations: int, seed: int, timeout: float, results: list[dict]) -> None:
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed + index)
+    at = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+    for step in range(iterations + 1):
+        action = "start" if step == 0 else rng.choice(ACTIONS)
+        start = time.perf_counter()
+        errors: list[str] = []
+        try:
+            if step:
+                _apply(at, action, rng)
+            at.run()
+            errors = _errors(at)
+        except Exception as exc:  # a crashed rerun still counts as a sample
+            errors = [f"{type(exc).__name__}: {exc}"]
+        results.append(
+            {"session": index, "action": action, "seconds": time.perf_counter() - start, "errors": errors}
+        )
+
+
+def _latency_summary(samples: list[dict]) -> dict:
+    latencies = sorted(s["seconds"] * 1000 for s in samples)
+    return {
+        "p50": round(percentile(latencies, 50), 1),
+        "p95": round(percentile(latencies, 95), 1),
+        "p99": round(percentile(latencies, 99), 1),
+        "max": round(latencies[-1], 1) if latencies else 0.0,
+    }
+
+
+def summarize(samples: list[dict], wall_s: float) -> dict:
+    errors = [e for s in samples for e in s["errors"]]
+    actions = sorted({s["action"] for s in samples})
+    return {
+        "reruns": len(samples),
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(len(samples) / wall_s, 2) if wall_s else 0.0,
+        "latency_ms": _latency_summary(samples),
+        "latency_ms_by_action": {a: _latency_summary([s for s in samples if s["action"] == a]) for a in actions},
+        "errors": len(errors),
+        "lock_errors": sum("locked" in e or "busy" in e for e in errors),
+        "error_samples": sorted(set(errors))[:5],
+    }
+
+
+def run_loadtest(
+    sessions: int = 4,
+    iterations: int = 10,
+    seed: int = 7,
+    upstream_latency_ms: float = 0.0,
+    timeout: float = 60.0,
+    workdir: Path | None = None,
+) -> dict:
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp, stub_upstream(upstream_latency_ms) as base:
+        tmp_path = Path(tmp)
+        env = {
+            "APP_DB_PATH": str(tmp_path / "food_security.db"),
+            "APP_DB_SNAPSHOT": str(tmp_path / "no_snapshot.db"),
+            "WB_API_BASE": f"{base}/v2",
+            "OWID_FOOD_URL": f"{base}/owid/undernourishment.csv",
+            "DEMO_MODE": "0",
+        }
+        previous_cache_dir = cache.CACHE_DIR
+        cache.CACHE_DIR = tmp_path / "cache"
+        reset_breakers()
+        negative_clear()
+        samples: list[dict] = []
+        try:
+            with _environment(env):
+                threads = [
+                    threading.Thread(target=_session, args=(i, iterations, seed, timeout, samples), name=f"session-{i}")
+                    for i in range(sessions)
+                ]
+                started = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                wall_s = time.perf_counter() - started
+                wait_for_refreshes(timeout)
+            conn = get_connection(env["APP_DB_PATH"], trace=False)
+            try:
+                modes = dict(conn.execute("SELECT mode, COUNT(*) FROM ingestion_runs GROUP BY mode").fetchall())
+            finally:
+                conn.close()
+        finally:
+            cache.CACHE_DIR = previous_cache_dir
+    report = summarize(samples, wall_s)
+    report.update(
+        {
+            "sessions": sessions,
+            "iterations": iterations,
+            "upstream_latency_ms": upstream_latency_ms,
+            "ingestion_modes": modes,
+        }
+    )
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Drive N concurrent AppTest sessions against a temp DB and stub upstreams.")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=10, help="Widget interactions per session after the first run")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--upstream-latency-ms", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-rerun timeout in seconds")
+    parser.add_argument("--output", help="Write the JSON report to this file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = run_loadtest(args.sessions, args.iterations, args.seed, args.upstream_latency_ms, args.timeout)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload, encoding="utf-8")
+    else:
+        print(payload)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from src.alerts import add_alert_rule, evaluate_alerts
+from src.cache import cache_get
+from src.db import get_connection, init_db, query_country_values, upsert_meta, upsert_values
+from src.scenarios import simulate
+from src.scoring import compute_scores, score_trend
+
+from .synthetic import (
+    country_codes,
+    generate_alert_rules,
+    generate_meta,
+    generate_values,
+    indicator_ids,
+    populate_cache,
+)
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+SCALES = {
+    "tiny": {"countries": 3, "indicators": 7, "months": 24, "rules_per_country": 5, "cache_entries": 20},
+    "small": {"countries": 20, "indicators": 7, "months": 120, "rules_per_country": 20, "cache_entries": 200},
+    "medium": {"countries": 100, "indicators": 12, "months": 240, "rules_per_country": 50, "cache_entries": 1000},
+    "large": {"countries": 200, "indicators": 20, "months": 480, "rules_per_country": 100, "cache_entries": 5000},
+}
+
+
+def _measure(fn: Callable[[], object], repeat: int, setup: Callable[[], None] | None = None) -> dict:
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "max_s": max(timings),
+        "repeat": repeat,
+    }
+
+
+def _latest_rows(rows: list[dict]) -> list[dict]:
+    latest: dict[str, dict] = {}
+    for row in rows:
+        current = latest.get(row["indicator_id"])
+        if current is None or row["date"] > current["date"]:
+            latest[row["indicator_id"]] = row
+    return list(latest.values())
+
+
+def run_suite(scale: dict, repeat: int = 5, seed: int = 7, workdir: Path | None = None) -> dict:
+    countries = country_codes(scale["countries"])
+    indicators = indicator_ids(scale["indicators"])
+    meta = generate_meta(indicators)
+    values = generate_values(scale["countries"], scale["indicators"], scale["months"], seed=seed)
+    target = countries[0]
+    results: dict[str, dict] = {}
+
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        tmp_path = Path(tmp)
+        db_path = tmp_path / "bench.db"
+        state: dict = {}
+
+        def fresh_db() -> None:
+            if "conn" in state:
+                state["conn"].close()
+            db_path.unlink(missing_ok=True)
+            state["conn"] = get_connection(db_path)
+            init_db(state["conn"])
+            upsert_meta(state["conn"], meta)
+
+        results["upsert_values"] = _measure(lambda: upsert_values(state["conn"], values), repeat, setup=fresh_db)
+        conn = state["conn"]
+
+        results["query_country_values"] = _measure(lambda: query_country_values(conn, target), repeat)
+
+        window_rows = [dict(r) for r in query_country_values(conn, target)]
+        latest_rows = _latest_rows(window_rows)
+        results["compute_scores"] = _measure(lambda: compute_scores(window_rows, latest_rows), repeat)
+        results["score_trend"] = _measure(lambda: score_trend(window_rows), repeat)
+        results["simulate"] = _measure(
+            lambda: [simulate(latest_rows, "currency_depreciation", s, 12) for s in range(0, 100, 5)], repeat
+        )
+
+        for rule in generate_alert_rules([target], indicators, scale["rules_per_country"], seed=seed):
+            add_alert_rule(conn, *rule)
+        results["evaluate_alerts"] = _measure(lambda: evaluate_alerts(conn, target), repeat)
+        conn.close()
+
+        cache_dir = tmp_path / "cache"
+        keys = populate_cache(cache_dir, scale["cache_entries"], seed=seed)
+        results["cache_get"] = _measure(lambda: [cache_get(cache_dir, k, 3600) for k in keys], repeat)
+
+    return {
+        "scale": scale,
+        "rows": len(values),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 1.5, min_delta_s: float = 0.002) -> list[dict]:
+    regressions = []
+    for name, stats in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        ratio = stats["median_s"] / base["median_s"] if base["median_s"] > 0 else 0.0
+        if ratio > tolerance and stats["median_s"] - base["median_s"] > min_delta_s:
+            regressions.append({"benchmark": name, "baseline_s": base["median_s"], "current_s": stats["median_s"], "ratio": round(ratio, 2)})
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the app's hot paths on synthetic data.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--countries", type=int)
+    parser.add_argument("--indicators", type=int)
+    parser.add_argument("--months", type=int)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Allowed slowdown ratio vs baseline median")
+    parser.add_argument("--min-delta", type=float, default=0.002, help="Ignore slowdowns smaller than this many seconds")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    scale = dict(SCALES[args.scale])
+    for key in ("countries", "indicators", "months"):
+        if getattr(args, key):
+            scale[key] = getattr(args, key)
+
+    current = run_suite(scale, repeat=args.repeat, seed=args.seed)
+    current["scale_name"] = args.scale
+    payload = json.dumps(current, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload, encoding="utf-8")
+    else:
+        print(payload)
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.write_text(payload + "\n", encoding="utf-8")
+        print(f"Baseline written to {baseline_path}", file=sys.stderr)
+        return 0
+    if not baseline_path.exists():
+        print("No baseline found; skipping regression check", file=sys.stderr)
+        return 0
+
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    if baseline.get("scale") != current["scale"]:
+        print("Baseline was recorded at a different scale; skipping regression check", file=sys.stderr)
+        return 0
+    regressions = compare(current, baseline, args.tolerance, args.min_delta)
+    for r in regressions:
+        print(f"REGRESSION {r['benchmark']}: {r['baseline_s']:.4f}s -> {r['current_s']:.4f}s (x{r['ratio']})", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import itertools
+import random
+import string
+from datetime import date
+from pathlib import Path
+
+from src.cache import cache_set
+from src.scoring import INDICATOR_CATEGORY
+
+CATEGORIES = ["food", "conflict", "macro"]
+LAST_UPDATED = "2026-01-01T00:00:00Z"
+
+
+def country_codes(n: int) -> list[str]:
+    codes = ("".join(p) for p in itertools.product(string.ascii_uppercase, repeat=3))
+    return list(itertools.islice(codes, n))
+
+
+def indicator_ids(n: int) -> list[str]:
+    known = list(INDICATOR_CATEGORY)
+    return known[:n] + [f"synthetic_{i:03d}" for i in range(max(0, n - len(known)))]
+
+
+def month_starts(n: int, end: date = date(2025, 12, 1)) -> list[str]:
+    months = []
+    year, month = end.year, end.month
+    for _ in range(n):
+        months.append(f"{year:04d}-{month:02d}-01")
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    return months[::-1]
+
+
+def generate_meta(indicators: list[str]) -> list[dict]:
+    return [
+        {
+            "indicator_id": iid,
+            "indicator_name": iid.replace("_", " ").title(),
+            "category": INDICATOR_CATEGORY.get(iid, CATEGORIES[i % len(CATEGORIES)]),
+            "unit": "index",
+            "source": "Synthetic",
+            "source_url": "local",
+        }
+        for i, iid in enumerate(indicators)
+    ]
+
+
+def generate_values(n_countries: int, n_indicators: int, n_months: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    months = month_starts(n_months)
+    rows: list[dict] = []
+    for country in country_codes(n_countries):
+        for iid in indicator_ids(n_indicators):
+            level = rng.uniform(5, 80)
+            drift = rng.uniform(-0.05, 0.05)
+            for month in months:
+                level = max(0.0, level + drift + rng.gauss(0, 1.5))
+                if rng.random() < 0.01:
+                    level *= rng.uniform(1.2, 2.0)
+                rows.append(
+                    {
+                        "country_iso3": country,
+                        "date": month,
+                        "indicator_id": iid,
+                        "value": round(level, 3),
+                        "unit": "index",
+                        "source": "Synthetic",
+                        "last_updated": LAST_UPDATED,
+                    }
+                )
+    return rows
+
+
+def generate_alert_rules(countries: list[str], indicators: list[str], per_country: int, seed: int = 7) -> list[tuple]:
+    rng = random.Random(seed)
+    rules = []
+    for country in countries:
+        for _ in range(per_country):
+            rules.append((country, rng.choice(indicators), rng.choice(["above", "below"]), round(rng.uniform(5, 80), 1)))
+    return rules
+
+
+def populate_cache(cache_dir: Path, n_entries: int, payload_rows: int = 80, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    keys = []
+    for i in range(n_entries):
+        key = f"https://api.example.org/v2/series/{i}?format=json"
+        payload = [{"page": 1}, [{"date": str(2025 - j), "value": rng.random()} for j in range(payload_rows)]]
+        cache_set(cache_dir, key, payload)
+        keys.append(key)
+    return keys
@@ -1,8 +1,85 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import sqlite3
 
+from .db import iso_date_sql
+from .metrics import instrumented
+
+
+RULE_KINDS = ("threshold", "delta", "pct_change", "moving_average", "consecutive")
+
+# One pass over each rule's recent window: the cutoff subquery keeps only the last
+# `lookback + 1` observations per rule (lookback = largest `periods` among the country's
+# rules), window functions derive the kind-specific metric, and only the latest row per
+# rule is compared against its threshold.
+EVALUATE_SQL = f"""
+WITH rules AS (
+    SELECT a.alert_id, a.indicator_id, a.direction, a.threshold, a.kind, a.periods, c.country_key, i.indicator_key
+    FROM alerts a
+    JOIN dim_country c ON c.country_iso3 = a.country_iso3
+    JOIN dim_indicator i ON i.indicator_id = a.indicator_id
+    WHERE a.country_iso3 = ?
+),
+series AS (
+    SELECT r.alert_id, r.indicator_id, r.direction, r.threshold, r.kind, r.periods, f.day, f.value,
+           CASE WHEN (r.direction = 'above' AND f.value >= r.threshold)
+                  OR (r.direction <> 'above' AND f.value <= r.threshold) THEN 1 ELSE 0 END AS breach
+    FROM rules r
+    JOIN value_facts f ON f.country_key = r.country_key AND f.indicator_key = r.indicator_key
+    WHERE f.day >= COALESCE(
+        (
+            SELECT p.day FROM value_facts p
+            WHERE p.country_key = r.country_key AND p.indicator_key = r.indicator_key
+            ORDER BY p.day DESC LIMIT 1 OFFSET ?
+        ),
+        0
+    )
+),
+windowed AS (
+    SELECT *,
+           ROW_NUMBER() OVER w AS rn,
+           COUNT(*) OVER (PARTITION BY alert_id) AS n,
+           LAG(value, periods) OVER w AS prev_value,
+           SUM(value) OVER w AS cum_value,
+           SUM(breach) OVER w AS cum_breach
+    FROM series
+    WINDOW w AS (PARTITION BY alert_id ORDER BY day)
+),
+lagged AS (
+    SELECT *,
+           LAG(cum_value, periods) OVER w AS cum_value_before,
+           LAG(cum_breach, periods) OVER w AS cum_breach_before
+    FROM windowed
+    WINDOW w AS (PARTITION BY alert_id ORDER BY day)
+),
+latest AS (
+    SELECT alert_id, indicator_id, direction, threshold, kind, periods, day, value,
+           CASE kind
+               WHEN 'threshold' THEN value
+               WHEN 'delta' THEN value - prev_value
+               WHEN 'pct_change' THEN
+                   CASE WHEN prev_value <> 0 THEN (value - prev_value) * 100.0 / ABS(prev_value) END
+               WHEN 'moving_average' THEN
+                   CASE WHEN rn >= periods THEN (cum_value - COALESCE(cum_value_before, 0)) / periods END
+               WHEN 'consecutive' THEN
+                   CASE WHEN rn >= periods THEN cum_breach - COALESCE(cum_breach_before, 0) END
+           END AS metric
+    FROM lagged
+    WHERE rn = n
+)
+SELECT alert_id, indicator_id, kind, {iso_date_sql("day")} AS date,
+       CASE WHEN kind = 'consecutive' THEN value ELSE metric END AS observed_value
+FROM latest
+WHERE metric IS NOT NULL
+  AND CASE
+          WHEN kind = 'consecutive' THEN metric >= periods
+          WHEN direction = 'above' THEN metric >= threshold
+          ELSE metric <= threshold
+      END
+ORDER BY alert_id
+"""
+
 
 def add_alert_rule(
     conn: sqlite3.Connection,
@@ -10,71 +87,142 @@ def add_alert_rule(
     indicator_id: str,
     direction: str,
     threshold: float,
+    kind: str = "threshold",
+    periods: int = 1,
 ) -> int:
+    if kind not in RULE_KINDS:
+        raise ValueError(f"Unknown alert rule kind: {kind}")
+    if periods < 1:
+        raise ValueError("periods must be >= 1")
     cur = conn.execute(
         """
-        INSERT INTO alerts(country_iso3, indicator_id, direction, threshold, created_at)
-        VALUES (?,?,?,?,?)
+        INSERT INTO alerts(country_iso3, indicator_id, direction, threshold, created_at, kind, periods)
+        VALUES (?,?,?,?,?,?,?)
         """,
-        (country_iso3, indicator_id, direction, threshold, datetime.now(timezone.utc).isoformat()),
+        (country_iso3, indicator_id, direction, threshold, datetime.now(timezone.utc).isoformat(), kind, int(periods)),
     )
     conn.commit()
     return int(cur.lastrowid)
 
 
+@instrumented("alerts.evaluate")
 def evaluate_alerts(conn: sqlite3.Connection, country_iso3: str) -> list[dict]:
-    rules = conn.execute("SELECT * FROM alerts WHERE country_iso3=?", (country_iso3,)).fetchall()
-    hits: list[dict] = []
-    for rule in rules:
-        latest = conn.execute(
-            """
-            SELECT value, date FROM indicators_values
-            WHERE country_iso3=? AND indicator_id=?
-            ORDER BY date DESC LIMIT 1
-            """,
-            (country_iso3, rule["indicator_id"]),
-        ).fetchone()
-        if not latest:
-            continue
-        triggered = (
-            latest["value"] >= rule["threshold"]
-            if rule["direction"] == "above"
-            else latest["value"] <= rule["threshold"]
+    lookback = conn.execute("SELECT MAX(periods) FROM alerts WHERE country_iso3=?", (country_iso3,)).fetchone()[0]
+    if lookback is None:
+        return []
+    hits = [dict(r) for r in conn.execute(EVALUATE_SQL, (country_iso3, int(lookback))).fetchall()]
+    triggered_at = datetime.now(timezone.utc).isoformat()
+    params = [(triggered_at, h["alert_id"], h["date"], h["observed_value"]) for h in hits]
+    # Re-triggering the same observation bumps the existing event instead of adding a row.
+    conn.executemany(
+        """
+        UPDATE alert_events SET occurrences = occurrences + 1, last_triggered_at = ?
+        WHERE alert_id = ? AND date = ? AND observed_value = ?
+        """,
+        params,
+    )
+    conn.executemany(
+        """
+        INSERT INTO alert_events(triggered_at, alert_id, date, observed_value)
+        SELECT ?1, ?2, ?3, ?4
+        WHERE NOT EXISTS (
+            SELECT 1 FROM alert_events WHERE alert_id = ?2 AND date = ?3 AND observed_value = ?4
         )
-        if triggered:
-            conn.execute(
-                """
-                INSERT INTO alert_events(alert_id, triggered_at, observed_value, date)
-                VALUES (?,?,?,?)
-                """,
-                (
-                    rule["alert_id"],
-                    datetime.now(timezone.utc).isoformat(),
-                    latest["value"],
-                    latest["date"],
-                ),
-            )
-            hits.append(
-                {
-                    "alert_id": rule["alert_id"],
-                    "indicator_id": rule["indicator_id"],
-                    "observed_value": latest["value"],
-                    "date": latest["date"],
-                }
-            )
+        """,
+        params,
+    )
     conn.commit()
     return hits
 
 
-def list_alert_events(conn: sqlite3.Connection, country_iso3: str) -> list[dict]:
-    rows = conn.execute(
+def count_alert_events(conn: sqlite3.Connection, country_iso3: str) -> int:
+    row = conn.execute(
+        """
+        SELECT COUNT(*) FROM alert_events ae
+        JOIN alerts a ON a.alert_id = ae.alert_id
+        WHERE a.country_iso3 = ?
+        """,
+        (country_iso3,),
+    ).fetchone()
+    return int(row[0])
+
+
+def alert_event_summary(conn: sqlite3.Connection, country_iso3: str) -> dict:
+    row = conn.execute(
         """
-        SELECT ae.event_id, ae.triggered_at, ae.observed_value, ae.date, a.indicator_id
+        SELECT COUNT(ae.event_id) AS events,
+               COALESCE(SUM(ae.occurrences), 0) AS occurrences,
+               COUNT(DISTINCT ae.alert_id) AS rules_triggered,
+               MAX(COALESCE(ae.last_triggered_at, ae.triggered_at)) AS last_triggered_at
         FROM alert_events ae
         JOIN alerts a ON a.alert_id = ae.alert_id
         WHERE a.country_iso3 = ?
-        ORDER BY ae.triggered_at DESC
         """,
         (country_iso3,),
+    ).fetchone()
+    return dict(row)
+
+
+def list_alert_events(
+    conn: sqlite3.Connection,
+    country_iso3: str,
+    limit: int | None = None,
+    before: tuple[str, int] | None = None,
+) -> list[dict]:
+    params: list = [country_iso3]
+    keyset = ""
+    if before is not None:
+        keyset = "AND (ae.triggered_at, ae.event_id) < (?, ?)"
+        params.extend(before)
+    params.append(-1 if limit is None else int(limit))
+    rows = conn.execute(
+        f"""
+        SELECT ae.event_id, ae.triggered_at, ae.observed_value, ae.date, a.indicator_id, a.kind,
+               ae.occurrences, ae.last_triggered_at
+        FROM alert_events ae
+        JOIN alerts a ON a.alert_id = ae.alert_id
+        WHERE a.country_iso3 = ? {keyset}
+        ORDER BY ae.triggered_at DESC, ae.event_id DESC
+        LIMIT ?
+        """,
+        params,
     ).fetchall()
     return [dict(r) for r in rows]
+
+
+def compact_alert_events(conn: sqlite3.Connection, retention_days: int | None = None) -> dict:
+    collapsed = conn.execute(
+        """
+        UPDATE alert_events
+        SET occurrences = (
+                SELECT SUM(d.occurrences) FROM alert_events d
+                WHERE d.alert_id = alert_events.alert_id AND d.date = alert_events.date
+                  AND d.observed_value = alert_events.observed_value
+            ),
+            last_triggered_at = (
+                SELECT MAX(COALESCE(d.last_triggered_at, d.triggered_at)) FROM alert_events d
+                WHERE d.alert_id = alert_events.alert_id AND d.date = alert_events.date
+                  AND d.observed_value = alert_events.observed_value
+            )
+        WHERE event_id IN (
+            SELECT MIN(event_id) FROM alert_events
+            GROUP BY alert_id, date, observed_value
+            HAVING COUNT(*) > 1
+        )
+        """
+    ).rowcount
+    removed = conn.execute(
+        """
+        DELETE FROM alert_events
+        WHERE event_id NOT IN (SELECT MIN(event_id) FROM alert_events GROUP BY alert_id, date, observed_value)
+        """
+    ).rowcount
+    expired = 0
+    if retention_days is not None:
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).isoformat()
+        expired = conn.execute(
+            "DELETE FROM alert_events WHERE COALESCE(last_triggered_at, triggered_at) < ?",
+            (cutoff,),
+        ).rowcount
+    conn.commit()
+    return {"collapsed": collapsed, "removed": removed, "expired": expired}
@@ -2,62 +2,222 @@ from __future__ import annotations
 
 import hashlib
 import json
+import os
+import threading
 import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
+from .circuit import CLOSED, CircuitOpenError, get_breaker
+from .metrics import incr, timed
 
-CACHE_DIR = Path("app_data/cache")
+CACHE_DIR = Path(os.getenv("APP_CACHE_DIR", "app_data/cache"))
+NEGATIVE_TTL_SECONDS = float(os.getenv("APP_NEGATIVE_CACHE_S", "60"))
+_NEGATIVE_LOCK = threading.Lock()
+_NEGATIVE: dict[str, tuple[float, str]] = {}
+STALE_GRACE_SECONDS = float(os.getenv("APP_CACHE_STALE_GRACE_S", str(60 * 60 * 24)))
+
+FRESH = "fresh"
+STALE = "stale"
+REVALIDATING = "revalidating"
+_FRESHNESS_LOCK = threading.Lock()
+_FRESHNESS: dict[str, dict] = {}
+_REFRESHING: dict[str, threading.Thread] = {}
+_TRACKED = threading.local()
 
 
 def _cache_file(cache_dir: Path, key: str) -> Path:
     return cache_dir / f"{hashlib.sha256(key.encode()).hexdigest()}.json"
 
 
-def cache_get(cache_dir: Path, key: str, ttl_seconds: int) -> Any | None:
-    path = _cache_file(cache_dir, key)
-    if not path.exists():
+def _load_payload(path: Path) -> dict | None:
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        return {"stored_at": float(payload["stored_at"]), "data": payload["data"]}
+    except FileNotFoundError:
+        return None
+    except (ValueError, KeyError, TypeError):  # torn or foreign file: treat as a miss, the next fetch rewrites it
+        incr("cache.corrupt")
         return None
-    payload = json.loads(path.read_text(encoding="utf-8"))
-    if time.time() - payload["stored_at"] > ttl_seconds:
+
+
+def cache_get(cache_dir: Path, key: str, ttl_seconds: int) -> Any | None:
+    payload = _load_payload(_cache_file(cache_dir, key))
+    if payload is None or time.time() - payload["stored_at"] > ttl_seconds:
         return None
     return payload["data"]
 
 
+def cache_read(cache_dir: Path, key: str) -> tuple[Any, float] | None:
+    payload = _load_payload(_cache_file(cache_dir, key))
+    if payload is None:
+        return None
+    return payload["data"], time.time() - payload["stored_at"]
+
+
 def cache_set(cache_dir: Path, key: str, data: Any) -> None:
     cache_dir.mkdir(parents=True, exist_ok=True)
-    _cache_file(cache_dir, key).write_text(
-        json.dumps({"stored_at": time.time(), "data": data}), encoding="utf-8"
-    )
+    path = _cache_file(cache_dir, key)
+    partial = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        partial.write_text(json.dumps({"stored_at": time.time(), "data": data}), encoding="utf-8")
+        os.replace(partial, path)
+    finally:
+        partial.unlink(missing_ok=True)
 
 
-def fetch_with_cache(
-    url: str,
-    *,
-    ttl_seconds: int = 60 * 60 * 24,
-    as_json: bool = True,
-    timeout: int = 30,
-    retries: int = 3,
-    backoff_seconds: float = 1.0,
-) -> Any:
-    cached = cache_get(CACHE_DIR, url, ttl_seconds)
-    if cached is not None:
-        return cached
+def negative_get(url: str, ttl_seconds: float = NEGATIVE_TTL_SECONDS) -> str | None:
+    with _NEGATIVE_LOCK:
+        entry = _NEGATIVE.get(url)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > ttl_seconds:
+            del _NEGATIVE[url]
+            return None
+        return entry[1]
+
+
+def negative_set(url: str, message: str) -> None:
+    with _NEGATIVE_LOCK:
+        _NEGATIVE[url] = (time.monotonic(), message)
+
+
+def negative_clear() -> None:
+    with _NEGATIVE_LOCK:
+        _NEGATIVE.clear()
+
+
+def _host_failed(exc: Exception) -> bool:
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status is None or status >= 500 or status == 429
+
 
+def _set_freshness(url: str, state: str) -> None:
+    with _FRESHNESS_LOCK:
+        _FRESHNESS[url] = {"url": url, "state": state, "checked_at": time.time()}
+
+
+def _note_freshness(url: str, state: str) -> None:
+    _set_freshness(url, state)
+    seen = getattr(_TRACKED, "seen", None)
+    if seen is not None:
+        seen[url] = state
+
+
+@contextmanager
+def track_freshness() -> Iterator[dict[str, str]]:
+    previous = getattr(_TRACKED, "seen", None)
+    _TRACKED.seen = seen = {}
+    try:
+        yield seen
+    finally:
+        _TRACKED.seen = previous
+
+
+def freshness_states() -> list[dict]:
+    with _FRESHNESS_LOCK:
+        return [dict(v) for _, v in sorted(_FRESHNESS.items())]
+
+
+def wait_for_refreshes(timeout: float | None = None) -> None:
+    with _FRESHNESS_LOCK:
+        threads = list(_REFRESHING.values())
+    for thread in threads:
+        thread.join(timeout)
+
+
+def _refresh(url: str, options: dict) -> None:
+    try:
+        with timed("fetch.revalidate"):
+            _fetch_remote(url, **options)
+        _set_freshness(url, FRESH)
+    except Exception:
+        incr("fetch.revalidate_error")
+        _set_freshness(url, STALE)
+    finally:
+        with _FRESHNESS_LOCK:
+            _REFRESHING.pop(url, None)
+
+
+def _revalidate(url: str, options: dict) -> None:
+    with _FRESHNESS_LOCK:
+        # Single flight: concurrent stale readers share the refresh that is already running.
+        if url in _REFRESHING:
+            return
+        thread = threading.Thread(target=_refresh, args=(url, options), name="cache-revalidate", daemon=True)
+        _REFRESHING[url] = thread
+    incr("fetch.revalidate_started")
+    thread.start()
+
+
+def _fetch_remote(url: str, *, as_json: bool, timeout: int, retries: int, backoff_seconds: float) -> Any:
+    failure = negative_get(url)
+    if failure is not None:
+        incr("cache.negative_hit")
+        raise RuntimeError(f"recent failure for {url}: {failure}")
+
+    breaker = get_breaker(url)
     last_exc: Exception | None = None
     for attempt in range(retries):
+        if not breaker.allow():
+            incr("circuit.rejected")
+            last_exc = last_exc or CircuitOpenError(breaker.host, breaker.retry_in())
+            break
         try:
             import requests
 
-            resp = requests.get(url, timeout=timeout)
+            with timed("fetch.http"):
+                resp = requests.get(url, timeout=timeout)
             resp.raise_for_status()
+            incr("fetch.bytes", len(resp.content))
             data: Any = resp.json() if as_json else resp.text
+            breaker.record_success()
             cache_set(CACHE_DIR, url, data)
             return data
         except Exception as exc:  # network/runtime variability
             last_exc = exc
-            if attempt < retries - 1:
+            incr("fetch.error")
+            if _host_failed(exc):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if attempt < retries - 1 and breaker.state == CLOSED:
+                incr("fetch.retry")
                 time.sleep(backoff_seconds * (2**attempt))
     if last_exc:
+        if not isinstance(last_exc, CircuitOpenError):
+            negative_set(url, str(last_exc))
         raise last_exc
     raise RuntimeError("fetch failed")
+
+
+def fetch_with_cache(
+    url: str,
+    *,
+    ttl_seconds: int = 60 * 60 * 24,
+    as_json: bool = True,
+    timeout: int = 30,
+    retries: int = 3,
+    backoff_seconds: float = 1.0,
+    stale_grace_seconds: float | None = None,
+) -> Any:
+    grace = STALE_GRACE_SECONDS if stale_grace_seconds is None else stale_grace_seconds
+    options = {"as_json": as_json, "timeout": timeout, "retries": retries, "backoff_seconds": backoff_seconds}
+    with timed("fetch_with_cache"):
+        entry = cache_read(CACHE_DIR, url)
+        if entry is not None:
+            data, age = entry
+            if age <= ttl_seconds:
+                incr("cache.hit")
+                _note_freshness(url, FRESH)
+                return data
+            if age <= ttl_seconds + grace:
+                incr("cache.stale_hit")
+                _note_freshness(url, REVALIDATING)
+                _revalidate(url, options)
+                return data
+        incr("cache.miss")
+        data = _fetch_remote(url, **options)
+        _note_freshness(url, FRESH)
+        return data
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Callable
+from urllib.parse import urlsplit
+
+from .metrics import incr
+
+FAILURE_THRESHOLD = int(os.getenv("APP_CIRCUIT_FAILURES", "3"))
+COOLDOWN_SECONDS = float(os.getenv("APP_CIRCUIT_COOLDOWN_S", "60"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, host: str, retry_in: float) -> None:
+        super().__init__(f"circuit open for {host}; retry in {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        host: str,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        cooldown_seconds: float = COOLDOWN_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.host = host
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def retry_in(self) -> float:
+        with self._lock:
+            if self._state == CLOSED:
+                return 0.0
+            return max(0.0, self._opened_at + self.cooldown_seconds - self._clock())
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and self._clock() - self._opened_at >= self.cooldown_seconds:
+                self._state = HALF_OPEN
+                self._probing = False
+            # Half-open lets exactly one probe through; everyone else keeps failing fast.
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    incr("circuit.open")
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._probing = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"host": self.host, "state": self._state, "failures": self._failures}
+
+
+_LOCK = threading.Lock()
+_BREAKERS: dict[str, CircuitBreaker] = {}
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def get_breaker(url: str) -> CircuitBreaker:
+    host = host_of(url)
+    with _LOCK:
+        breaker = _BREAKERS.get(host)
+        if breaker is None:
+            breaker = _BREAKERS[host] = CircuitBreaker(host)
+        return breaker
+
+
+def breaker_states() -> list[dict]:
+    with _LOCK:
+        breakers = list(_BREAKERS.values())
+    return [dict(b.snapshot(), retry_in_s=round(b.retry_in(), 1)) for b in sorted(breakers, key=lambda b: b.host)]
+
+
+def reset_breakers() -> None:
+    with _LOCK:
+        _BREAKERS.clear()
@@ -2,10 +2,15 @@ from __future__ import annotations
 
 import os
 import sqlite3
+import threading
 from pathlib import Path
 from typing import Iterable
 
+from .dbtrace import TracingConnection
+from .metrics import incr, timed
+
 DEFAULT_DB = Path("app_data/food_security.db")
+MMAP_SIZE = int(os.getenv("APP_DB_MMAP_MB", "64")) * 1024 * 1024
 
 
 def resolve_db_path() -> Path:
@@ -22,11 +27,18 @@ def resolve_db_path() -> Path:
         return fallback
 
 
-def get_connection(db_path: Path | str | None = None) -> sqlite3.Connection:
+def tracing_enabled() -> bool:
+    return os.getenv("APP_DB_TRACE", "0") == "1"
+
+
+def get_connection(db_path: Path | str | None = None, trace: bool | None = None) -> sqlite3.Connection:
     path = Path(db_path) if db_path else resolve_db_path()
     path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(path)
+    trace = tracing_enabled() if trace is None else trace
+    conn = sqlite3.connect(path, factory=TracingConnection) if trace else sqlite3.connect(path)
     conn.row_factory = sqlite3.Row
+    if MMAP_SIZE > 0:
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
     return conn
 
 
@@ -35,8 +47,32 @@ def get_db_path(conn: sqlite3.Connection) -> str:
     return row[2] if row and row[2] else ":memory:"
 
 
-def init_db(conn: sqlite3.Connection) -> None:
-    conn.executescript(
+def iso_date_sql(column: str) -> str:
+    return f"printf('%04d-%02d-%02d', {column} / 10000, {column} / 100 % 100, {column} % 100)"
+
+
+def day_sql(expr: str) -> str:
+    return f"CAST(replace(substr({expr}, 1, 10), '-', '') AS INTEGER)"
+
+
+def to_day(value) -> int:
+    return int(str(value)[:10].replace("-", ""))
+
+
+def _execute_script(conn: sqlite3.Connection, script: str) -> None:
+    # executescript() commits any open transaction first, so migrations run statement by statement.
+    statement = ""
+    for part in script.split(";"):
+        statement += part + ";"
+        if sqlite3.complete_statement(statement):
+            if statement.strip().rstrip(";").strip():
+                conn.execute(statement)
+            statement = ""
+
+
+def _migrate_base(conn: sqlite3.Connection) -> None:
+    _execute_script(
+        conn,
         """
         CREATE TABLE IF NOT EXISTS indicators_meta(
             indicator_id TEXT PRIMARY KEY,
@@ -65,7 +101,9 @@ def init_db(conn: sqlite3.Connection) -> None:
             indicator_id TEXT NOT NULL,
             direction TEXT NOT NULL,
             threshold REAL NOT NULL,
-            created_at TEXT NOT NULL
+            created_at TEXT NOT NULL,
+            kind TEXT NOT NULL DEFAULT 'threshold',
+            periods INTEGER NOT NULL DEFAULT 1
         );
 
         CREATE TABLE IF NOT EXISTS alert_events(
@@ -74,6 +112,8 @@ def init_db(conn: sqlite3.Connection) -> None:
             triggered_at TEXT NOT NULL,
             observed_value REAL NOT NULL,
             date TEXT NOT NULL,
+            occurrences INTEGER NOT NULL DEFAULT 1,
+            last_triggered_at TEXT,
             FOREIGN KEY(alert_id) REFERENCES alerts(alert_id)
         );
 
@@ -94,7 +134,171 @@ def init_db(conn: sqlite3.Connection) -> None:
         );
         """
     )
+    _ensure_columns(conn, "alerts", {"kind": "TEXT NOT NULL DEFAULT 'threshold'", "periods": "INTEGER NOT NULL DEFAULT 1"})
+    _ensure_columns(conn, "alert_events", {"occurrences": "INTEGER NOT NULL DEFAULT 1", "last_triggered_at": "TEXT"})
+    _execute_script(
+        conn,
+        """
+        CREATE INDEX IF NOT EXISTS idx_alert_events_alert_time ON alert_events(alert_id, triggered_at);
+        CREATE INDEX IF NOT EXISTS idx_alerts_country ON alerts(country_iso3);
+        """
+    )
+
+
+_FACT_UPSERT = """
+INSERT INTO value_facts(country_key, indicator_key, day, value, source_key, updated_at)
+VALUES (
+    (SELECT country_key FROM dim_country WHERE country_iso3 = {p}country_iso3),
+    (SELECT indicator_key FROM dim_indicator WHERE indicator_id = {p}indicator_id),
+    {day},
+    {p}value,
+    (SELECT source_key FROM dim_source WHERE source = {p}source AND unit = {p}unit),
+    COALESCE(CAST(strftime('%s', {p}last_updated) AS INTEGER), CAST(strftime('%s', 'now') AS INTEGER))
+)
+ON CONFLICT(country_key, indicator_key, day) DO UPDATE SET
+  value=excluded.value,
+  source_key=excluded.source_key,
+  updated_at=excluded.updated_at
+"""
+UPSERT_FACT_SQL = _FACT_UPSERT.format(p=":", day=day_sql(":date"))
+
+
+def _migrate_compact_values(conn: sqlite3.Connection) -> None:
+    # Dictionary-encoded, integer-dated, clustered storage; indicators_values becomes a
+    # view with the original columns so readers keep working unchanged.
+    _execute_script(
+        conn,
+        f"""
+        CREATE TABLE dim_country(country_key INTEGER PRIMARY KEY, country_iso3 TEXT NOT NULL UNIQUE);
+        CREATE TABLE dim_indicator(indicator_key INTEGER PRIMARY KEY, indicator_id TEXT NOT NULL UNIQUE);
+        CREATE TABLE dim_source(
+            source_key INTEGER PRIMARY KEY,
+            source TEXT NOT NULL,
+            unit TEXT NOT NULL,
+            UNIQUE(source, unit)
+        );
+        CREATE TABLE value_facts(
+            country_key INTEGER NOT NULL,
+            indicator_key INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            value REAL NOT NULL,
+            source_key INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL,
+            PRIMARY KEY(country_key, indicator_key, day)
+        ) WITHOUT ROWID;
+
+        INSERT INTO dim_country(country_iso3)
+        SELECT DISTINCT country_iso3 FROM indicators_values ORDER BY country_iso3;
+        INSERT INTO dim_indicator(indicator_id)
+        SELECT DISTINCT indicator_id FROM indicators_values ORDER BY indicator_id;
+        INSERT INTO dim_source(source, unit)
+        SELECT DISTINCT source, unit FROM indicators_values ORDER BY source, unit;
+        INSERT INTO value_facts(country_key, indicator_key, day, value, source_key, updated_at)
+        SELECT c.country_key, i.indicator_key, {day_sql("v.date")}, v.value, s.source_key,
+               COALESCE(CAST(strftime('%s', v.last_updated) AS INTEGER), CAST(strftime('%s', 'now') AS INTEGER))
+        FROM indicators_values v
+        JOIN dim_country c ON c.country_iso3 = v.country_iso3
+        JOIN dim_indicator i ON i.indicator_id = v.indicator_id
+        JOIN dim_source s ON s.source = v.source AND s.unit = v.unit;
+        DROP TABLE indicators_values;
+
+        CREATE INDEX idx_value_facts_country_day ON value_facts(country_key, day, indicator_key, value, source_key);
+        CREATE INDEX idx_value_facts_indicator_day ON value_facts(indicator_key, day, value);
+        CREATE INDEX idx_ingestion_runs_country_time ON ingestion_runs(country_iso3, ingested_at);
+
+        CREATE VIEW indicators_values AS
+        SELECT c.country_iso3,
+               {iso_date_sql("f.day")} AS date,
+               i.indicator_id,
+               f.value,
+               s.unit,
+               s.source,
+               strftime('%Y-%m-%dT%H:%M:%SZ', f.updated_at, 'unixepoch') AS last_updated
+        FROM value_facts f
+        JOIN dim_country c ON c.country_key = f.country_key
+        JOIN dim_indicator i ON i.indicator_key = f.indicator_key
+        JOIN dim_source s ON s.source_key = f.source_key;
+
+        CREATE TRIGGER indicators_values_insert INSTEAD OF INSERT ON indicators_values
+        BEGIN
+            INSERT OR IGNORE INTO dim_country(country_iso3) VALUES (NEW.country_iso3);
+            INSERT OR IGNORE INTO dim_indicator(indicator_id) VALUES (NEW.indicator_id);
+            INSERT OR IGNORE INTO dim_source(source, unit) VALUES (NEW.source, NEW.unit);
+            {_FACT_UPSERT.format(p="NEW.", day=day_sql("NEW.date"))};
+        END;
+        """
+    )
+
+
+def _migrate_conflict_events(conn: sqlite3.Connection) -> None:
+    _execute_script(
+        conn,
+        """
+        CREATE TABLE IF NOT EXISTS conflict_event_files(
+            path TEXT PRIMARY KEY,
+            byte_offset INTEGER NOT NULL DEFAULT 0,
+            rows_read INTEGER NOT NULL DEFAULT 0,
+            file_size INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS conflict_event_months(
+            path TEXT NOT NULL,
+            country_iso3 TEXT NOT NULL,
+            day INTEGER NOT NULL,
+            events INTEGER NOT NULL,
+            fatalities INTEGER NOT NULL,
+            PRIMARY KEY(country_iso3, day, path)
+        ) WITHOUT ROWID;
+        """
+    )
+
+
+def _migrate_conflict_fingerprint(conn: sqlite3.Connection) -> None:
+    _ensure_columns(conn, "conflict_event_files", {"fingerprint": "TEXT"})
+
+
+MIGRATIONS = [_migrate_base, _migrate_compact_values, _migrate_conflict_events, _migrate_conflict_fingerprint]
+SCHEMA_VERSION = len(MIGRATIONS)
+_MIGRATION_LOCK = threading.Lock()
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+
+def init_db(conn: sqlite3.Connection) -> None:
+    if get_schema_version(conn) >= SCHEMA_VERSION:
+        return
+    with _MIGRATION_LOCK:
+        for target, migrate in enumerate(MIGRATIONS, start=1):
+            _apply_migration(conn, target, migrate)
+
+
+def _apply_migration(conn: sqlite3.Connection, target: int, migrate) -> None:
     conn.commit()
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        # The write lock is taken before the version is re-read, so concurrent processes
+        # (app, export/conflict/snapshot CLIs) cannot both run the same migration.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) < target:
+                migrate(conn)
+                conn.execute(f"PRAGMA user_version = {target}")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.isolation_level = isolation_level
+
+
+def _ensure_columns(conn: sqlite3.Connection, table: str, columns: dict[str, str]) -> None:
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for name, ddl in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
 
 
 def record_ingestion_run(conn: sqlite3.Connection, country_iso3: str, mode: str, ingested_at: str) -> None:
@@ -137,29 +341,36 @@ def upsert_meta(conn: sqlite3.Connection, rows: Iterable[dict]) -> None:
 
 
 def upsert_values(conn: sqlite3.Connection, rows: Iterable[dict]) -> None:
-    conn.executemany(
-        """
-        INSERT INTO indicators_values(country_iso3,date,indicator_id,value,unit,source,last_updated)
-        VALUES (:country_iso3,:date,:indicator_id,:value,:unit,:source,:last_updated)
-        ON CONFLICT(country_iso3,date,indicator_id) DO UPDATE SET
-          value=excluded.value,
-          unit=excluded.unit,
-          source=excluded.source,
-          last_updated=excluded.last_updated
-        """,
-        rows,
-    )
-    conn.commit()
+    rows = list(rows)
+    with timed("db.upsert_values"):
+        conn.executemany(
+            "INSERT OR IGNORE INTO dim_country(country_iso3) VALUES (?)",
+            [(c,) for c in sorted({r["country_iso3"] for r in rows})],
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO dim_indicator(indicator_id) VALUES (?)",
+            [(i,) for i in sorted({r["indicator_id"] for r in rows})],
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO dim_source(source, unit) VALUES (?, ?)",
+            sorted({(r["source"], r["unit"]) for r in rows}),
+        )
+        cur = conn.executemany(UPSERT_FACT_SQL, rows)
+        conn.commit()
+    incr("db.upsert_values.rows", max(cur.rowcount, 0))
 
 
 def query_country_values(conn: sqlite3.Connection, country_iso3: str):
     return conn.execute(
-        """
-        SELECT v.country_iso3, v.date, v.indicator_id, v.value, v.unit, v.source, m.category
-        FROM indicators_values v
-        JOIN indicators_meta m ON m.indicator_id = v.indicator_id
-        WHERE v.country_iso3 = ?
-        ORDER BY v.date
+        f"""
+        SELECT c.country_iso3, {iso_date_sql("f.day")} AS date, i.indicator_id, f.value, s.unit, s.source, m.category
+        FROM dim_country c
+        JOIN value_facts f ON f.country_key = c.country_key
+        JOIN dim_indicator i ON i.indicator_key = f.indicator_key
+        JOIN dim_source s ON s.source_key = f.source_key
+        JOIN indicators_meta m ON m.indicator_id = i.indicator_id
+        WHERE c.country_iso3 = ?
+        ORDER BY f.day
         """,
         (country_iso3,),
     ).fetchall()
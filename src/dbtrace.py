@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("APP_DB_SLOW_MS", "50"))
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def normalize_sql(sql: str) -> str:
+    return _WHITESPACE.sub(" ", _LITERALS.sub("?", sql)).strip()
+
+
+class QueryStats:
+    def __init__(self, max_slow: int = 50) -> None:
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict] = {}
+        self.slow: deque[dict] = deque(maxlen=max_slow)
+
+    def record(self, sql: str, seconds: float, rows: int) -> None:
+        key = normalize_sql(sql)
+        with self._lock:
+            entry = self._stats.setdefault(key, {"sql": key, "calls": 0, "total_s": 0.0, "max_s": 0.0, "rows": 0})
+            entry["calls"] += 1
+            entry["total_s"] += seconds
+            entry["max_s"] = max(entry["max_s"], seconds)
+            entry["rows"] += max(rows, 0)
+
+    def record_slow(self, sql: str, seconds: float, rows: int, plan: list[str]) -> None:
+        with self._lock:
+            self.slow.append({"sql": normalize_sql(sql), "ms": round(seconds * 1000, 2), "rows": rows, "plan": plan})
+
+    def top(self, n: int = 10, key: str = "total_s") -> list[dict]:
+        with self._lock:
+            entries = [dict(e) for e in self._stats.values()]
+        for e in entries:
+            e["mean_s"] = e["total_s"] / e["calls"] if e["calls"] else 0.0
+        return sorted(entries, key=lambda e: e[key], reverse=True)[:n]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self.slow.clear()
+
+
+QUERY_STATS = QueryStats()
+
+
+class TracingCursor(sqlite3.Cursor):
+    _pending: tuple | None = None
+
+    def _begin(self, sql: str, parameters, elapsed: float) -> None:
+        self._finish()
+        self._pending = (sql, parameters, elapsed, 0)
+        if self.description is None:
+            self._pending = (sql, parameters, elapsed, self.rowcount)
+            self._finish()
+
+    def _add(self, elapsed: float, rows: int) -> None:
+        if self._pending:
+            sql, parameters, total, count = self._pending
+            self._pending = (sql, parameters, total + elapsed, count + rows)
+
+    def _finish(self) -> None:
+        if not self._pending:
+            return
+        sql, parameters, elapsed, rows = self._pending
+        self._pending = None
+        conn = self.connection
+        stats: QueryStats = getattr(conn, "trace_stats", QUERY_STATS)
+        stats.record(sql, elapsed, rows)
+        slow_ms = getattr(conn, "slow_query_ms", SLOW_QUERY_MS)
+        if elapsed * 1000 >= slow_ms:
+            plan = explain_query_plan(conn, sql, parameters)
+            stats.record_slow(sql, elapsed, rows, plan)
+            logger.warning(
+                "slow query %.1f ms (%d rows): %s\n  plan: %s",
+                elapsed * 1000,
+                rows,
+                normalize_sql(sql),
+                " | ".join(plan) or "n/a",
+            )
+
+    def execute(self, sql: str, parameters=()):
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        self._begin(sql, parameters, time.perf_counter() - start)
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._pending = (sql, None, time.perf_counter() - start, self.rowcount)
+        self._finish()
+        return self
+
+    def executescript(self, sql_script: str):
+        self._finish()
+        start = time.perf_counter()
+        super().executescript(sql_script)
+        self._pending = (sql_script, None, time.perf_counter() - start, 0)
+        self._finish()
+        return self
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._add(time.perf_counter() - start, 0 if row is None else 1)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size: int | None = None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._add(time.perf_counter() - start, len(rows))
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._add(time.perf_counter() - start, len(rows))
+        self._finish()
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._add(time.perf_counter() - start, 0)
+            self._finish()
+            raise
+        self._add(time.perf_counter() - start, 1)
+        return row
+
+    def close(self) -> None:
+        self._finish()
+        super().close()
+
+    def __del__(self) -> None:
+        self._finish()
+
+
+class TracingConnection(sqlite3.Connection):
+    trace_stats: QueryStats = QUERY_STATS
+    slow_query_ms: float = SLOW_QUERY_MS
+
+    def cursor(self, factory=TracingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script: str):
+        return self.cursor().executescript(sql_script)
+
+
+def explain_query_plan(conn: sqlite3.Connection, sql: str, parameters=()) -> list[str]:
+    if parameters is None or not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return []
+    try:
+        cur = sqlite3.Connection.cursor(conn, sqlite3.Cursor)
+        rows = cur.execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+    except sqlite3.Error:
+        return []
+    return [str(r[3]) for r in rows]
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import pandas as pd
+
+DEFAULT_MAX_POINTS = 1000
+
+
+def downsample_minmax(
+    df: pd.DataFrame,
+    x: str = "date",
+    y: str = "value",
+    group: str | None = "indicator_id",
+    max_points: int = DEFAULT_MAX_POINTS,
+) -> pd.DataFrame:
+    if df.empty or max_points <= 0:
+        return df
+    ordered = df.sort_values([group, x] if group else [x], kind="stable").reset_index(drop=True)
+    keys = ordered[group] if group else pd.Series(0, index=ordered.index)
+    grouped = ordered.groupby(keys, sort=False)
+    pos = grouped.cumcount()
+    size = grouped[y].transform("size")
+    if int(size.max()) <= max_points:
+        return ordered
+
+    # Each series keeps its endpoints plus the min and max of every bucket, so peaks survive.
+    buckets = max(1, (max_points - 2) // 2)
+    bucket = pos * buckets // size
+    by_bucket = ordered[y].groupby([keys, bucket], sort=False)
+    keep = pd.Series(size <= max_points)
+    keep |= (pos == 0) | (pos == size - 1)
+    keep.loc[by_bucket.idxmin().to_numpy()] = True
+    keep.loc[by_bucket.idxmax().to_numpy()] = True
+    return ordered[keep]
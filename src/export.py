@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import sqlite3
+import sys
+from pathlib import Path
+from typing import IO, Iterable, Iterator
+
+from .db import get_connection, init_db, iso_date_sql, to_day
+
+EXPORT_COLUMNS = ["country_iso3", "date", "indicator_id", "value", "unit", "source", "category"]
+EXPORT_FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "ndjson": ("ndjson", "application/x-ndjson"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def _placeholders(values: list[str]) -> str:
+    return ",".join("?" for _ in values)
+
+
+def _dimension_keys(conn: sqlite3.Connection, key_column: str, table: str, name_column: str, names: list[str] | None = None) -> list[int]:
+    where = f"WHERE {name_column} IN ({_placeholders(names)})" if names else ""
+    return [r[0] for r in conn.execute(f"SELECT {key_column} FROM {table} {where} ORDER BY {key_column}", names or [])]
+
+
+def iter_export_chunks(
+    conn: sqlite3.Connection,
+    countries: Iterable[str] | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    indicators: Iterable[str] | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[list[dict]]:
+    clauses: list[str] = []
+    params: list = []
+    indicator_list = sorted(set(indicators)) if indicators else []
+    country_list = sorted(set(countries)) if countries else []
+    indicator_keys = _dimension_keys(conn, "indicator_key", "dim_indicator", "indicator_id", indicator_list) if indicator_list else None
+    country_keys = None
+    if country_list or indicator_keys is not None:
+        # An indicator filter alone would send the planner to idx_value_facts_indicator_day, which is not
+        # in export order; pinning every country key turns it into a clustered-key range scan instead.
+        country_keys = _dimension_keys(conn, "country_key", "dim_country", "country_iso3", country_list or None)
+    if country_keys == [] or indicator_keys == []:
+        return
+    for column, keys in (("country_key", country_keys), ("indicator_key", indicator_keys)):
+        if keys is not None:
+            clauses.append(f"f.{column} IN ({_placeholders(keys)})")
+            params.extend(keys)
+    # Without an indicator list a bare day range picks idx_value_facts_country_day, whose
+    # (country, day, indicator) order needs a temp B-tree; "+" keeps the clustered key in charge.
+    day = "f.day" if indicator_keys is not None else "+f.day"
+    if start_date:
+        clauses.append(f"{day} >= ?")
+        params.append(to_day(start_date))
+    if end_date:
+        clauses.append(f"{day} <= ?")
+        params.append(to_day(end_date))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    # value_facts is pinned as the outer loop (CROSS JOIN) and walked along its clustered
+    # (country, indicator, day) key, so SQLite streams rows without a sort.
+    cur = conn.execute(
+        f"""
+        SELECT c.country_iso3, {iso_date_sql("f.day")} AS date, i.indicator_id, f.value, s.unit, s.source, m.category
+        FROM value_facts f
+        CROSS JOIN dim_country c ON c.country_key = f.country_key
+        CROSS JOIN dim_indicator i ON i.indicator_key = f.indicator_key
+        CROSS JOIN dim_source s ON s.source_key = f.source_key
+        CROSS JOIN indicators_meta m ON m.indicator_id = i.indicator_id
+        {where}
+        ORDER BY f.country_key, f.indicator_key, f.day
+        """,
+        params,
+    )
+    try:
+        while True:
+            rows = cur.fetchmany(max(1, chunk_size))
+            if not rows:
+                break
+            yield [dict(zip(EXPORT_COLUMNS, r)) for r in rows]
+    finally:
+        cur.close()
+
+
+def write_csv(chunks: Iterable[list[dict]], fp: IO[bytes]) -> int:
+    text = io.TextIOWrapper(fp, encoding="utf-8", newline="", write_through=True)
+    writer = csv.DictWriter(text, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    count = 0
+    try:
+        for chunk in chunks:
+            writer.writerows(chunk)
+            count += len(chunk)
+    finally:
+        text.detach()
+    return count
+
+
+def write_ndjson(chunks: Iterable[list[dict]], fp: IO[bytes]) -> int:
+    count = 0
+    for chunk in chunks:
+        fp.write("".join(json.dumps(r, default=str) + "\n" for r in chunk).encode("utf-8"))
+        count += len(chunk)
+    return count
+
+
+def write_parquet(chunks: Iterable[list[dict]], fp: IO[bytes]) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:  # optional dependency
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)") from exc
+
+    schema = pa.schema(
+        [
+            ("country_iso3", pa.string()),
+            ("date", pa.string()),
+            ("indicator_id", pa.string()),
+            ("value", pa.float64()),
+            ("unit", pa.string()),
+            ("source", pa.string()),
+            ("category", pa.string()),
+        ]
+    )
+    count = 0
+    with pq.ParquetWriter(fp, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            count += len(chunk)
+    return count
+
+
+WRITERS = {"csv": write_csv, "ndjson": write_ndjson, "parquet": write_parquet}
+
+
+def export_values(conn: sqlite3.Connection, fp: IO[bytes], fmt: str = "csv", **filters) -> int:
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    return WRITERS[fmt](iter_export_chunks(conn, **filters), fp)
+
+
+def export_file_name(countries: Iterable[str] | None, fmt: str) -> str:
+    country_list = sorted(set(countries)) if countries else []
+    stem = "_".join(c.lower() for c in country_list) if 0 < len(country_list) <= 3 else "all_countries"
+    return f"{stem}_export.{EXPORT_FORMATS[fmt][0]}"
+
+
+def _split(value: str | None) -> list[str] | None:
+    if not value:
+        return None
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Stream indicator values out of the app database.")
+    parser.add_argument("--db", help="SQLite database path (defaults to the app database)")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--countries", help="Comma-separated ISO3 codes (default: all)")
+    parser.add_argument("--indicators", help="Comma-separated indicator ids (default: all)")
+    parser.add_argument("--start", help="Inclusive start date, YYYY-MM-DD")
+    parser.add_argument("--end", help="Inclusive end date, YYYY-MM-DD")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--out", help="Output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    conn = get_connection(args.db)
+    init_db(conn)
+    filters = {
+        "countries": _split(args.countries),
+        "indicators": _split(args.indicators),
+        "start_date": args.start,
+        "end_date": args.end,
+        "chunk_size": args.chunk_size,
+    }
+    if args.out:
+        with Path(args.out).open("wb") as fp:
+            count = export_values(conn, fp, args.format, **filters)
+    else:
+        count = export_values(conn, sys.stdout.buffer, args.format, **filters)
+        sys.stdout.buffer.flush()
+    print(f"Exported {count} rows", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,44 +1,84 @@
 from __future__ import annotations
 
 import os
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
-from .db import record_ingestion_run, upsert_meta, upsert_values
-from .sources_conflict import load_demo_data
+from .cache import FRESH, track_freshness
+from .db import get_latest_ingestion_run, record_ingestion_run, upsert_meta, upsert_values
+from .metrics import instrumented
+from .sources_conflict import has_conflict_events, load_demo_data
 from .sources_food import fetch_food_source
 from .sources_worldbank import fetch_world_bank
 
+SNAPSHOT_PREFIX = "snapshot:"
+# Seeded runs keep the mode the snapshot was built with; only live-built data stands in for a live run.
+_REUSABLE_MODES = {
+    True: {"demo", f"{SNAPSHOT_PREFIX}demo", f"{SNAPSHOT_PREFIX}fallback_demo"},
+    False: {"live", f"{SNAPSHOT_PREFIX}live"},
+}
 
-def ingest_country(conn, country_iso3: str, demo_mode: bool = False, ttl_hours: int = 24) -> str:
+
+def fresh_ingestion_mode(conn, country_iso3: str, demo_mode: bool, ttl_hours: int = 24) -> str | None:
+    last = get_latest_ingestion_run(conn, country_iso3)
+    if not last or last["mode"] not in _REUSABLE_MODES[demo_mode]:
+        return None
+    age = datetime.now(timezone.utc) - datetime.fromisoformat(last["ingested_at"])
+    return last["mode"] if age < timedelta(hours=max(1, ttl_hours)) else None
+
+
+def _persist_run(conn, country_iso3: str, meta: list[dict], rows: list[dict], mode: str) -> None:
+    upsert_meta(conn, meta)
+    upsert_values(conn, rows)
+    record_ingestion_run(conn, country_iso3, mode, datetime.now(timezone.utc).isoformat())
+
+
+def _store_run(conn, country_iso3: str, meta: list[dict], rows: list[dict], mode: str, peer_index=None, writer=None) -> str:
+    if writer is None:
+        _persist_run(conn, country_iso3, meta, rows, mode)
+    else:
+        writer.call(_persist_run, country_iso3, meta, rows, mode)
+    if peer_index is not None:
+        peer_index.update(rows)
+    return mode
+
+
+@instrumented("ingest.country")
+def ingest_country(
+    conn,
+    country_iso3: str,
+    demo_mode: bool = False,
+    ttl_hours: int = 24,
+    peer_index=None,
+    reuse_fresh: bool = False,
+    writer=None,
+) -> str:
     force_demo = os.getenv("DEMO_MODE", "0") == "1"
+    if reuse_fresh:
+        fresh = fresh_ingestion_mode(conn, country_iso3, demo_mode or force_demo, ttl_hours)
+        if fresh:
+            return fresh
     meta, demo_values = load_demo_data()
-    upsert_meta(conn, meta)
+    country_demo = [v for v in demo_values if v["country_iso3"] == country_iso3]
+    # Event-level ACLED aggregates own conflict_events once present; the demo seed must never overwrite them.
+    if has_conflict_events(conn, country_iso3):
+        country_demo = [v for v in country_demo if v["indicator_id"] != "conflict_events"]
 
     if demo_mode or force_demo:
-        upsert_values(conn, [v for v in demo_values if v["country_iso3"] == country_iso3])
-        mode = "demo"
-        record_ingestion_run(conn, country_iso3, mode, datetime.now(timezone.utc).isoformat())
-        return mode
-
-    seed_demo = [
-        v
-        for v in demo_values
-        if v["country_iso3"] == country_iso3
-        and v["indicator_id"] in {"food_price_stress", "currency_pressure", "conflict_events"}
-    ]
+        return _store_run(conn, country_iso3, meta, country_demo, "demo", peer_index, writer)
+
+    seeded = {"food_price_stress", "currency_pressure", "conflict_events"}
+    seed_demo = [v for v in country_demo if v["indicator_id"] in seeded]
     try:
         ttl_seconds = max(1, ttl_hours) * 3600
         live_rows = []
-        live_rows.extend(fetch_world_bank(country_iso3, ttl_seconds=ttl_seconds))
-        live_rows.extend(fetch_food_source(country_iso3, ttl_seconds=ttl_seconds))
+        with track_freshness() as freshness:
+            live_rows.extend(fetch_world_bank(country_iso3, ttl_seconds=ttl_seconds))
+            live_rows.extend(fetch_food_source(country_iso3, ttl_seconds=ttl_seconds))
         values = seed_demo + live_rows
         if not values:
             raise RuntimeError("No live values")
-        upsert_values(conn, values)
-        mode = "live"
+        # Served from cache past its TTL while a background refresh runs; re-ingest on the next rerun.
+        mode = "live" if all(state == FRESH for state in freshness.values()) else "live_stale"
     except Exception:
-        upsert_values(conn, [v for v in demo_values if v["country_iso3"] == country_iso3])
-        mode = "fallback_demo"
-
-    record_ingestion_run(conn, country_iso3, mode, datetime.now(timezone.utc).isoformat())
-    return mode
+        values, mode = country_demo, "fallback_demo"
+    return _store_run(conn, country_iso3, meta, values, mode, peer_index, writer)
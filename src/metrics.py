@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Iterator
+
+_LOCK = threading.Lock()
+_COUNTERS: dict[str, float] = defaultdict(float)
+_TIMERS: dict[str, dict[str, float]] = {}
+
+
+def incr(name: str, amount: float = 1.0) -> None:
+    with _LOCK:
+        _COUNTERS[name] += amount
+
+
+def observe(name: str, seconds: float) -> None:
+    with _LOCK:
+        stats = _TIMERS.setdefault(name, {"count": 0, "total_s": 0.0, "max_s": 0.0, "last_s": 0.0})
+        stats["count"] += 1
+        stats["total_s"] += seconds
+        stats["max_s"] = max(stats["max_s"], seconds)
+        stats["last_s"] = seconds
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def instrumented(name: str) -> Callable:
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def snapshot() -> dict:
+    with _LOCK:
+        counters = dict(_COUNTERS)
+        timers = {k: dict(v) for k, v in _TIMERS.items()}
+    for stats in timers.values():
+        stats["mean_s"] = stats["total_s"] / stats["count"] if stats["count"] else 0.0
+    return {"generated_at": time.time(), "counters": counters, "timers": timers}
+
+
+def reset() -> None:
+    with _LOCK:
+        _COUNTERS.clear()
+        _TIMERS.clear()
+
+
+def to_json(snap: dict | None = None) -> str:
+    return json.dumps(snap or snapshot(), indent=2, sort_keys=True)
+
+
+def _metric_name(prefix: str, name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", f"{prefix}_{name}")
+
+
+def _sample_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def to_prometheus(snap: dict | None = None, prefix: str = "food_security") -> str:
+    snap = snap or snapshot()
+    lines: list[str] = []
+    for name, value in sorted(snap["counters"].items()):
+        metric = _metric_name(prefix, name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {_sample_value(value)}")
+    for name, stats in sorted(snap["timers"].items()):
+        metric = _metric_name(prefix, name) + "_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        lines.append(f"{metric}_count {_sample_value(stats['count'])}")
+        lines.append(f"{metric}_sum {stats['total_s']:.6f}")
+        lines.append(f"# TYPE {metric}_max gauge")
+        lines.append(f"{metric}_max {stats['max_s']:.6f}")
+        lines.append(f"# TYPE {metric}_last gauge")
+        lines.append(f"{metric}_last {stats['last_s']:.6f}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from bisect import bisect_left, bisect_right, insort
+from pathlib import Path
+from typing import Callable, Iterable
+
+from .db import get_connection
+
+
+def _date_key(value) -> str:
+    return str(value)[:10]
+
+
+def _fact_rows(conn: sqlite3.Connection) -> Iterable[dict]:
+    # Straight from value_facts with the small dimensions resolved in Python: no view joins or date formatting per row.
+    countries = dict(conn.execute("SELECT country_key, country_iso3 FROM dim_country").fetchall())
+    indicators = dict(conn.execute("SELECT indicator_key, indicator_id FROM dim_indicator").fetchall())
+    for country_key, indicator_key, day, value in conn.execute(
+        "SELECT country_key, indicator_key, day, value FROM value_facts"
+    ):
+        yield {
+            "country_iso3": countries[country_key],
+            "indicator_id": indicators[indicator_key],
+            "date": f"{day // 10000:04d}-{day // 100 % 100:02d}-{day % 100:02d}",
+            "value": value,
+        }
+
+
+class PeerIndex:
+    def __init__(self, loader: Callable[[], Iterable[dict]] | None = None) -> None:
+        self._lock = threading.Lock()
+        self._loader = loader
+        self._by_country: dict[tuple[str, str], dict[str, float]] = {}
+        self._sorted: dict[tuple[str, str], list[float]] = {}
+
+    @classmethod
+    def from_db(cls, conn: sqlite3.Connection) -> PeerIndex:
+        index = cls()
+        index.update(_fact_rows(conn))
+        return index
+
+    @classmethod
+    def deferred(cls, db_path: Path | str) -> PeerIndex:
+        def load() -> list[dict]:
+            conn = get_connection(db_path)
+            try:
+                return list(_fact_rows(conn))
+            finally:
+                conn.close()
+
+        return cls(loader=load)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loader is None
+
+    def _ensure_loaded(self) -> None:
+        if self._loader is not None:
+            rows = self._loader()
+            self._loader = None
+            self._apply(rows)
+
+    def update(self, rows: Iterable[dict]) -> None:
+        with self._lock:
+            # Until the first lookup, committed rows are picked up by the loader instead.
+            if self._loader is None:
+                self._apply(rows)
+
+    def _apply(self, rows: Iterable[dict]) -> None:
+        for row in rows:
+            key = (row["indicator_id"], _date_key(row["date"]))
+            value = float(row["value"])
+            countries = self._by_country.setdefault(key, {})
+            ordered = self._sorted.setdefault(key, [])
+            old = countries.get(row["country_iso3"])
+            if old is not None:
+                if old == value:
+                    continue
+                del ordered[bisect_left(ordered, old)]
+            countries[row["country_iso3"]] = value
+            insort(ordered, value)
+
+    def peer_count(self, indicator_id: str, date) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._sorted.get((indicator_id, _date_key(date)), []))
+
+    def percentile(self, indicator_id: str, date, value: float) -> float | None:
+        with self._lock:
+            self._ensure_loaded()
+            ordered = self._sorted.get((indicator_id, _date_key(date)))
+            if not ordered:
+                return None
+            below = bisect_left(ordered, value)
+            equal = bisect_right(ordered, value) - below
+            return (below + 0.5 * equal) / len(ordered) * 100
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import cProfile
+import os
+import pstats
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .metrics import incr
+
+PROFILE_DIR = Path(os.getenv("APP_PROFILE_DIR", "app_data/profiles"))
+PROFILE_KEEP = int(os.getenv("APP_PROFILE_KEEP", "20"))
+SAMPLE_INTERVAL_S = 0.005
+
+
+def profiling_enabled() -> bool:
+    return os.getenv("APP_PROFILE", "0") == "1"
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class RerunProfiler:
+    def __init__(self, interval_s: float = SAMPLE_INTERVAL_S) -> None:
+        self.interval_s = interval_s
+        self.profile: cProfile.Profile | None = cProfile.Profile()
+        self.samples: Counter[str] = Counter()
+        self.started_at = 0.0
+        self.elapsed_s = 0.0
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler: threading.Thread | None = None
+
+    def start(self) -> RerunProfiler:
+        self.started_at = time.perf_counter()
+        try:
+            self.profile.enable()
+        except ValueError:  # another profiler already owns this interpreter; keep sampling only
+            self.profile = None
+        self._sampler = threading.Thread(target=self._sample, name="rerun-sampler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self) -> RerunProfiler:
+        if self.profile is not None:
+            self.profile.disable()
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self.elapsed_s = time.perf_counter() - self.started_at
+        return self
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def top_functions(stats: pstats.Stats, n: int = 20) -> list[dict]:
+    rows = [
+        {
+            "function": f"{name} ({Path(filename).name}:{line})",
+            "calls": int(nc),
+            "tottime_s": round(tt, 4),
+            "cumtime_s": round(ct, 4),
+        }
+        for (filename, line, name), (_, nc, tt, ct, _) in stats.stats.items()
+    ]
+    return sorted(rows, key=lambda r: r["cumtime_s"], reverse=True)[:n]
+
+
+def _profile_dir(directory: Path | str | None) -> Path:
+    path = Path(directory) if directory else PROFILE_DIR
+    try:
+        path.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        path = Path(tempfile.gettempdir()) / "app_data" / "profiles"
+        path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def save_profile(profiler: RerunProfiler, label: str = "rerun", directory: Path | str | None = None) -> dict:
+    target = _profile_dir(directory)
+    stem = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')}_{re.sub(r'[^A-Za-z0-9_-]', '_', label)}"
+    collapsed_path = target / f"{stem}.collapsed"
+    collapsed_path.write_text(profiler.collapsed(), encoding="utf-8")
+    result = {
+        "label": label,
+        "elapsed_s": round(profiler.elapsed_s, 4),
+        "samples": sum(profiler.samples.values()),
+        "collapsed_path": str(collapsed_path),
+        "pstats_path": None,
+        "top": [],
+    }
+    if profiler.profile is not None:
+        pstats_path = target / f"{stem}.pstats"
+        profiler.profile.dump_stats(pstats_path)
+        result["pstats_path"] = str(pstats_path)
+        result["top"] = top_functions(pstats.Stats(profiler.profile))
+    incr("profile.captured")
+    _prune(target, PROFILE_KEEP)
+    return result
+
+
+def _prune(directory: Path, keep: int) -> None:
+    stems = sorted({p.stem for p in directory.glob("*.collapsed")}, reverse=True)
+    for stem in stems[max(keep, 1):]:
+        for suffix in (".collapsed", ".pstats"):
+            directory.joinpath(stem + suffix).unlink(missing_ok=True)
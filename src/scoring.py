@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from collections import defaultdict
+from collections import defaultdict, deque
+
+from .metrics import instrumented
 
 CATEGORY_WEIGHTS = {"food": 0.4, "conflict": 0.35, "macro": 0.25}
 INDICATOR_CATEGORY = {
@@ -10,6 +12,7 @@ INDICATOR_CATEGORY = {
     "undernourishment": "food",
     "food_price_stress": "food",
     "conflict_events": "conflict",
+    "conflict_fatalities": "conflict",
     "currency_pressure": "macro",
 }
 INVERT_FOR_RISK = {"gdp_growth"}
@@ -24,10 +27,27 @@ def _minmax(value: float, min_value: float, max_value: float, invert: bool = Fal
     return 100.0 - score if invert else score
 
 
-def compute_scores(window_rows: list[dict], latest_rows: list[dict]) -> dict:
+def _peer_score(peer_index, iid: str, date, value: float) -> float | None:
+    pct = peer_index.percentile(iid, date, value) if peer_index is not None else None
+    if pct is None:
+        return None
+    return 100.0 - pct if iid in INVERT_FOR_RISK else pct
+
+
+@instrumented("scoring.compute_scores")
+def compute_scores(
+    window_rows: list[dict],
+    latest_rows: list[dict],
+    baseline_window: int | None = None,
+    peer_index=None,
+) -> dict:
     by_indicator: dict[str, list[float]] = defaultdict(list)
-    for row in window_rows:
-        by_indicator[row["indicator_id"]].append(float(row["value"]))
+    if baseline_window:
+        for row in sorted(window_rows, key=lambda r: r["date"]):
+            by_indicator[row["indicator_id"]].append((row["date"], float(row["value"])))
+    else:
+        for row in window_rows:
+            by_indicator[row["indicator_id"]].append(float(row["value"]))
 
     indicator_scores: dict[str, float] = {}
     normalized_inputs: dict[str, float] = {}
@@ -36,8 +56,14 @@ def compute_scores(window_rows: list[dict], latest_rows: list[dict]) -> dict:
     for row in latest_rows:
         iid = row["indicator_id"]
         value = float(row["value"])
-        values = by_indicator.get(iid, [value])
-        norm = _minmax(value, min(values), max(values), invert=iid in INVERT_FOR_RISK)
+        if baseline_window:
+            history = [v for d, v in by_indicator.get(iid, []) if d <= row["date"]][-baseline_window:]
+            values = history or [value]
+        else:
+            values = by_indicator.get(iid, [value])
+        norm = _peer_score(peer_index, iid, row.get("date"), value)
+        if norm is None:
+            norm = _minmax(value, min(values), max(values), invert=iid in INVERT_FOR_RISK)
         category = row["category"]
         indicator_scores[iid] = norm
         normalized_inputs[iid] = round(norm, 2)
@@ -56,3 +82,54 @@ def compute_scores(window_rows: list[dict], latest_rows: list[dict]) -> dict:
         "normalized_inputs": normalized_inputs,
         "contributors": [(k, round(v, 2)) for k, v in contributors],
     }
+
+
+def sliding_minmax(values: list[float], window: int | None = None) -> list[tuple[float, float]]:
+    size = window or len(values)
+    lows: deque[int] = deque()
+    highs: deque[int] = deque()
+    bounds: list[tuple[float, float]] = []
+    for i, value in enumerate(values):
+        while lows and values[lows[-1]] >= value:
+            lows.pop()
+        lows.append(i)
+        while highs and values[highs[-1]] <= value:
+            highs.pop()
+        highs.append(i)
+        if lows[0] <= i - size:
+            lows.popleft()
+        if highs[0] <= i - size:
+            highs.popleft()
+        bounds.append((values[lows[0]], values[highs[0]]))
+    return bounds
+
+
+def score_trend(window_rows: list[dict], baseline_window: int | None = None, peer_index=None) -> list[tuple]:
+    series: dict[str, list[dict]] = defaultdict(list)
+    for row in sorted(window_rows, key=lambda r: r["date"]):
+        series[row["indicator_id"]].append(row)
+
+    # Normalize every observation once against its sliding (or expanding) baseline.
+    updates: dict = defaultdict(list)
+    for iid, obs in series.items():
+        values = [float(r["value"]) for r in obs]
+        for row, value, (low, high) in zip(obs, values, sliding_minmax(values, baseline_window)):
+            norm = _peer_score(peer_index, iid, row["date"], value)
+            if norm is None:
+                norm = _minmax(value, low, high, invert=iid in INVERT_FOR_RISK)
+            updates[row["date"]].append((iid, row["category"], norm))
+
+    current: dict[str, tuple[str, float]] = {}
+    trend: list[tuple] = []
+    for date_value in sorted(updates):
+        for iid, category, norm in updates[date_value]:
+            current[iid] = (category, norm)
+        buckets: dict[str, list[float]] = defaultdict(list)
+        for category, norm in current.values():
+            buckets[category].append(norm)
+        overall = 0.0
+        for cat, weight in CATEGORY_WEIGHTS.items():
+            values = buckets.get(cat)
+            overall += (round(sum(values) / len(values), 2) if values else 0.0) * weight
+        trend.append((date_value, round(overall, 2)))
+    return trend
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable
+
+from .db import get_connection, init_db
+from .ingest import SNAPSHOT_PREFIX, ingest_country
+from .sources_conflict import load_demo_data
+
+DEFAULT_SNAPSHOT = Path("data/snapshot/food_security.db")
+
+
+def snapshot_path() -> Path:
+    return Path(os.getenv("APP_DB_SNAPSHOT", str(DEFAULT_SNAPSHOT)))
+
+
+def demo_countries() -> list[str]:
+    _, values = load_demo_data()
+    return sorted({v["country_iso3"] for v in values})
+
+
+def build_snapshot(
+    out_path: Path | str | None = None,
+    countries: Iterable[str] | None = None,
+    demo_mode: bool = False,
+    ttl_hours: int = 24,
+) -> dict:
+    out = Path(out_path) if out_path else snapshot_path()
+    out.parent.mkdir(parents=True, exist_ok=True)
+    partial = out.with_name(out.name + ".partial")
+    partial.unlink(missing_ok=True)
+    modes: dict[str, str] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = get_connection(Path(tmp) / "build.db", trace=False)
+        try:
+            init_db(conn)
+            for iso3 in countries or demo_countries():
+                modes[iso3] = ingest_country(conn, iso3, demo_mode=demo_mode, ttl_hours=ttl_hours)
+            conn.execute("ANALYZE")
+            conn.commit()
+            # VACUUM INTO writes a defragmented copy with fresh statistics and no WAL or free pages.
+            conn.execute("VACUUM INTO ?", (str(partial),))
+        finally:
+            conn.close()
+    os.replace(partial, out)
+    return {"path": str(out), "bytes": out.stat().st_size, "countries": modes}
+
+
+def seed_from_snapshot(db_path: Path | str, snapshot: Path | str | None = None) -> bool:
+    target = Path(db_path)
+    source = Path(snapshot) if snapshot else snapshot_path()
+    if target.exists() or not source.exists():
+        return False
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(f"{target.name}.{os.getpid()}.seed")
+    shutil.copyfile(source, partial)
+    conn = sqlite3.connect(partial)
+    try:
+        conn.execute(
+            """
+            INSERT INTO ingestion_runs(country_iso3, mode, ingested_at)
+            SELECT r.country_iso3, ? || r.mode, ?
+            FROM ingestion_runs r
+            WHERE r.run_id = (
+                SELECT l.run_id FROM ingestion_runs l
+                WHERE l.country_iso3 = r.country_iso3
+                ORDER BY l.ingested_at DESC, l.run_id DESC
+                LIMIT 1
+            )
+            """,
+            (SNAPSHOT_PREFIX, datetime.now(timezone.utc).isoformat()),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    try:
+        # A hard link only succeeds if nobody created the database meanwhile.
+        os.link(partial, target)
+    except FileExistsError:
+        return False
+    except OSError:
+        if target.exists():
+            return False
+        os.replace(partial, target)
+        return True
+    finally:
+        partial.unlink(missing_ok=True)
+    return True
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Build a pre-ingested, compacted SQLite snapshot for cold starts.")
+    parser.add_argument("--out", help=f"Snapshot path (default: {DEFAULT_SNAPSHOT} or APP_DB_SNAPSHOT)")
+    parser.add_argument("--countries", help="Comma-separated ISO3 codes (default: every demo country)")
+    parser.add_argument("--demo", action="store_true", help="Skip live sources and use demo data only")
+    parser.add_argument("--ttl-hours", type=int, default=24, help="HTTP cache TTL for live sources")
+    args = parser.parse_args(argv)
+
+    countries = [c.strip().upper() for c in args.countries.split(",") if c.strip()] if args.countries else None
+    result = build_snapshot(args.out, countries, demo_mode=args.demo, ttl_hours=args.ttl_hours)
+    for iso3, mode in sorted(result["countries"].items()):
+        print(f"{iso3}: {mode}", file=sys.stderr)
+    print(f"Snapshot written to {result['path']} ({result['bytes']} bytes)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,7 +1,19 @@
 from __future__ import annotations
 
+import argparse
 import csv
+import hashlib
+import io
+import sqlite3
+import sys
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import BinaryIO, Iterator
+
+import pandas as pd
+
+from .db import get_connection, init_db, upsert_meta, upsert_values
+from .metrics import instrumented
 
 
 DEMO_META_PATH = Path("data/demo/indicators_meta.csv")
@@ -27,3 +39,313 @@ def load_demo_data() -> tuple[list[dict], list[dict]]:
     for row in value_rows:
         row["value"] = float(row["value"])
     return normalized_meta, value_rows
+
+
+EVENT_COLUMNS = {"country": "iso3", "date": "event_date", "fatalities": "fatalities"}
+EVENT_SOURCE = "ACLED"
+DEFAULT_EVENT_CHUNK_ROWS = 100_000
+FINGERPRINT_BYTES = 1 << 16
+FINGERPRINT_ROWS = 1024
+
+
+class _BoundedReader(io.RawIOBase):
+    def __init__(self, fp: BinaryIO, limit: int) -> None:
+        self._fp = fp
+        self._remaining = limit
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._remaining <= 0:
+            return 0
+        view = memoryview(buffer)[: self._remaining]
+        read = self._fp.readinto(view)
+        self._remaining -= read or 0
+        return read or 0
+
+
+def _complete_end(fp: BinaryIO, size: int, start: int, block: int = 1 << 16) -> int:
+    # Stop after the last newline so a row that is still being appended is read next time.
+    pos = size
+    while pos > start:
+        read_from = max(start, pos - block)
+        fp.seek(read_from)
+        chunk = fp.read(pos - read_from)
+        idx = chunk.rfind(b"\n")
+        if idx >= 0:
+            return read_from + idx + 1
+        pos = read_from
+    return start
+
+
+def iter_csv_event_chunks(
+    path: Path | str,
+    start: int = 0,
+    chunk_rows: int = DEFAULT_EVENT_CHUNK_ROWS,
+    columns: dict | None = None,
+    through: int | None = None,
+) -> Iterator[tuple[pd.DataFrame, int]]:
+    cols = columns or EVENT_COLUMNS
+    with Path(path).open("rb") as fp:
+        header_line = fp.readline()
+        header = next(csv.reader([header_line.decode("utf-8-sig")]))
+        size = fp.seek(0, io.SEEK_END)
+        begin = max(start, len(header_line))
+        # `through` reads up to that byte even if the last row has no trailing newline.
+        end = min(through, size) if through is not None else _complete_end(fp, size, begin)
+        if end <= begin:
+            return
+        fp.seek(begin)
+        reader = pd.read_csv(
+            io.BufferedReader(_BoundedReader(fp, end - begin)),
+            names=header,
+            header=None,
+            usecols=list(cols.values()),
+            dtype={cols["country"]: "string"},
+            chunksize=max(1, chunk_rows),
+        )
+        for chunk in reader:
+            yield chunk, end
+
+
+def iter_parquet_event_chunks(
+    path: Path | str, skip_rows: int = 0, chunk_rows: int = DEFAULT_EVENT_CHUNK_ROWS, columns: dict | None = None
+) -> Iterator[pd.DataFrame]:
+    import pyarrow.parquet as pq
+
+    cols = columns or EVENT_COLUMNS
+    parquet = pq.ParquetFile(path)
+    # Row groups that were fully read last time are skipped without being decompressed.
+    seen = 0
+    first_group = parquet.num_row_groups
+    for group in range(parquet.num_row_groups):
+        count = parquet.metadata.row_group(group).num_rows
+        if seen + count > skip_rows:
+            first_group = group
+            break
+        seen += count
+    groups = list(range(first_group, parquet.num_row_groups))
+    if not groups:
+        return
+    for batch in parquet.iter_batches(batch_size=max(1, chunk_rows), row_groups=groups, columns=list(cols.values())):
+        if seen + batch.num_rows <= skip_rows:
+            seen += batch.num_rows
+            continue
+        offset = max(0, skip_rows - seen)
+        seen += batch.num_rows
+        yield batch.slice(offset).to_pandas()
+
+
+def aggregate_events(chunk: pd.DataFrame, columns: dict | None = None) -> pd.DataFrame:
+    cols = columns or EVENT_COLUMNS
+    frame = pd.DataFrame(
+        {
+            "country_iso3": chunk[cols["country"]].astype("string").str.strip().str.upper(),
+            "month": pd.to_datetime(chunk[cols["date"]], errors="coerce").dt.to_period("M"),
+            "fatalities": pd.to_numeric(chunk[cols["fatalities"]], errors="coerce").fillna(0),
+        }
+    ).dropna(subset=["country_iso3", "month"])
+    grouped = frame.groupby(["country_iso3", "month"], sort=False)["fatalities"].agg(["size", "sum"]).reset_index()
+    grouped["day"] = grouped["month"].dt.year * 10000 + grouped["month"].dt.month * 100 + 1
+    return grouped.rename(columns={"size": "events", "sum": "fatalities"})[["country_iso3", "day", "events", "fatalities"]]
+
+
+def _accumulate(conn: sqlite3.Connection, path: str, monthly: pd.DataFrame) -> None:
+    conn.executemany(
+        """
+        INSERT INTO conflict_event_months(path, country_iso3, day, events, fatalities)
+        VALUES (?,?,?,?,?)
+        ON CONFLICT(country_iso3, day, path) DO UPDATE SET
+            events = events + excluded.events,
+            fatalities = fatalities + excluded.fatalities
+        """,
+        (
+            (path, r.country_iso3, int(r.day), int(r.events), round(r.fatalities))
+            for r in monthly.itertuples(index=False)
+        ),
+    )
+
+
+def _monthly_rows(conn: sqlite3.Connection, touched: set[tuple[str, int]]) -> list[dict]:
+    now = datetime.now(timezone.utc).isoformat()
+    rows: list[dict] = []
+    for country_iso3 in sorted({c for c, _ in touched}):
+        days = sorted(d for c, d in touched if c == country_iso3)
+        totals = {
+            r[0]: (r[1], r[2])
+            for r in conn.execute(
+                f"""
+                SELECT day, SUM(events), SUM(fatalities)
+                FROM conflict_event_months
+                WHERE country_iso3 = ? AND day IN ({",".join("?" for _ in days)})
+                GROUP BY day
+                """,
+                [country_iso3, *days],
+            )
+        }
+        for day in days:
+            events, fatalities = totals.get(day, (0, 0))
+            date = f"{day // 10000:04d}-{day // 100 % 100:02d}-01"
+            for indicator_id, value in (("conflict_events", events), ("conflict_fatalities", fatalities)):
+                rows.append(
+                    {
+                        "country_iso3": country_iso3,
+                        "date": date,
+                        "indicator_id": indicator_id,
+                        "value": float(value),
+                        "unit": "count",
+                        "source": EVENT_SOURCE,
+                        "last_updated": now,
+                    }
+                )
+    return rows
+
+
+def _csv_fingerprint(path: Path, offset: int) -> str:
+    # Head and tail of the consumed prefix: cheap, and any rewrite of already-counted rows changes it.
+    digest = hashlib.sha256(str(offset).encode())
+    with path.open("rb") as fp:
+        digest.update(fp.read(min(offset, FINGERPRINT_BYTES)))
+        tail = max(0, offset - FINGERPRINT_BYTES)
+        fp.seek(tail)
+        digest.update(fp.read(offset - tail))
+    return digest.hexdigest()
+
+
+def _parquet_fingerprint(path: Path, rows: int, columns: dict | None = None) -> str:
+    import pyarrow.parquet as pq
+
+    # Parquet files are rewritten on append, so hash the first and last rows already read
+    # (from the row groups that hold them) instead of raw bytes.
+    cols = list((columns or EVENT_COLUMNS).values())
+    parquet = pq.ParquetFile(path)
+    digest = hashlib.sha256(str(rows).encode())
+    for start, stop in ((0, min(rows, FINGERPRINT_ROWS)), (max(0, rows - FINGERPRINT_ROWS), rows)):
+        first = 0
+        for group in range(parquet.num_row_groups):
+            count = parquet.metadata.row_group(group).num_rows
+            lo, hi = max(start, first), min(stop, first + count)
+            if lo < hi:
+                frame = parquet.read_row_group(group, columns=cols).slice(lo - first, hi - lo).to_pandas()
+                digest.update(pd.util.hash_pandas_object(frame, index=False).values.tobytes())
+            first += count
+    return digest.hexdigest()
+
+
+@instrumented("source.conflict_events")
+def ingest_conflict_events(
+    conn: sqlite3.Connection,
+    path: Path | str,
+    chunk_rows: int = DEFAULT_EVENT_CHUNK_ROWS,
+    columns: dict | None = None,
+    peer_index=None,
+) -> dict:
+    file_path = Path(path)
+    key = str(file_path.resolve())
+    size = file_path.stat().st_size
+    state = conn.execute(
+        "SELECT byte_offset, rows_read, file_size, fingerprint FROM conflict_event_files WHERE path = ?", (key,)
+    ).fetchone()
+    offset, rows_read, last_size, fingerprint = tuple(state) if state else (0, 0, None, None)
+    is_parquet = file_path.suffix.lower() == ".parquet"
+    if is_parquet:
+        import pyarrow.parquet as pq
+
+        replaced = pq.ParquetFile(file_path).metadata.num_rows < rows_read
+        if not replaced and fingerprint is not None:
+            replaced = _parquet_fingerprint(file_path, rows_read, columns) != fingerprint
+    else:
+        replaced = size < offset
+        if not replaced and fingerprint is not None:
+            replaced = _csv_fingerprint(file_path, offset) != fingerprint
+    if replaced:
+        # The file was replaced rather than appended to: drop its contribution and start over.
+        offset, rows_read = 0, 0
+        touched = {(r[0], r[1]) for r in conn.execute("SELECT country_iso3, day FROM conflict_event_months WHERE path = ?", (key,))}
+        conn.execute("DELETE FROM conflict_event_months WHERE path = ?", (key,))
+    else:
+        touched = set()
+
+    events = 0
+    end = offset
+    if is_parquet:
+        chunks = ((chunk, None) for chunk in iter_parquet_event_chunks(file_path, rows_read, chunk_rows, columns))
+    else:
+        # A final row without a newline is held back once; if the file is still the same size on the
+        # next run the export is finished, so that row is consumed instead of being dropped for good.
+        settled = not replaced and fingerprint is not None and last_size == size and size > offset
+        chunks = iter_csv_event_chunks(file_path, offset, chunk_rows, columns, through=size if settled else None)
+    for chunk, chunk_end in chunks:
+        monthly = aggregate_events(chunk, columns)
+        _accumulate(conn, key, monthly)
+        touched.update(zip(monthly["country_iso3"], monthly["day"].astype(int)))
+        events += len(chunk)
+        end = chunk_end if chunk_end is not None else end
+
+    rows_read += events
+    if replaced or events or fingerprint is None:
+        if is_parquet:
+            fingerprint = _parquet_fingerprint(file_path, rows_read, columns)
+        else:
+            fingerprint = _csv_fingerprint(file_path, end)
+    conn.execute(
+        """
+        INSERT INTO conflict_event_files(path, byte_offset, rows_read, file_size, fingerprint, updated_at)
+        VALUES (?,?,?,?,?,?)
+        ON CONFLICT(path) DO UPDATE SET
+            byte_offset = excluded.byte_offset,
+            rows_read = excluded.rows_read,
+            file_size = excluded.file_size,
+            fingerprint = excluded.fingerprint,
+            updated_at = excluded.updated_at
+        """,
+        (key, end, rows_read, size, fingerprint, datetime.now(timezone.utc).isoformat()),
+    )
+    rows = _monthly_rows(conn, touched)
+    # upsert_values commits, so the running totals, the new offset and the indicator rows land together.
+    upsert_values(conn, rows)
+    if peer_index is not None:
+        peer_index.update(rows)
+    if is_parquet:
+        pending = 0
+    else:
+        with file_path.open("rb") as fp:
+            pending = max(0, size - max(end, len(fp.readline())))
+    return {"events": events, "months": len(touched), "rows": len(rows), "byte_offset": end, "pending_bytes": pending}
+
+
+def has_conflict_events(conn: sqlite3.Connection, country_iso3: str) -> bool:
+    return conn.execute("SELECT 1 FROM conflict_event_months WHERE country_iso3 = ? LIMIT 1", (country_iso3,)).fetchone() is not None
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Aggregate an event-level conflict export (CSV or Parquet) into monthly indicators.")
+    parser.add_argument("path", help="ACLED-style event file; re-running after an append only reads the new tail")
+    parser.add_argument("--db", help="SQLite database path (defaults to the app database)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_EVENT_CHUNK_ROWS)
+    parser.add_argument("--country-column", default=EVENT_COLUMNS["country"])
+    parser.add_argument("--date-column", default=EVENT_COLUMNS["date"])
+    parser.add_argument("--fatalities-column", default=EVENT_COLUMNS["fatalities"])
+    args = parser.parse_args(argv)
+
+    conn = get_connection(args.db)
+    init_db(conn)
+    meta, _ = load_demo_data()
+    upsert_meta(conn, meta)
+    columns = {"country": args.country_column, "date": args.date_column, "fatalities": args.fatalities_column}
+    result = ingest_conflict_events(conn, args.path, chunk_rows=args.chunk_rows, columns=columns)
+    print(
+        f"Read {result['events']} events into {result['months']} country-months (byte offset {result['byte_offset']})",
+        file=sys.stderr,
+    )
+    if result["pending_bytes"]:
+        print(
+            f"Held back {result['pending_bytes']} bytes after the last newline; they are read once the file stops changing",
+            file=sys.stderr,
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
 import csv
+import os
 from datetime import datetime, timezone
 
 from .cache import fetch_with_cache
+from .metrics import instrumented
 
+OWID_FOOD_URL = "https://ourworldindata.org/grapher/prevalence-of-undernourishment.csv"
 
+
+@instrumented("source.owid_food")
 def fetch_food_source(country_iso3: str, ttl_seconds: int = 60 * 60 * 24) -> list[dict]:
-    url = "https://ourworldindata.org/grapher/prevalence-of-undernourishment.csv"
+    url = os.getenv("OWID_FOOD_URL", OWID_FOOD_URL)
     text = fetch_with_cache(url, as_json=False, timeout=30, ttl_seconds=ttl_seconds)
     reader = csv.DictReader(text.splitlines())
     now = datetime.now(timezone.utc).isoformat()
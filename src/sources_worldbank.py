@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import os
 from datetime import datetime, timezone
 
 from .cache import fetch_with_cache
+from .metrics import instrumented
 
+WB_API_BASE = "https://api.worldbank.org/v2"
 WB_INDICATORS = {
     "inflation": ("FP.CPI.TOTL.ZG", "%"),
     "gdp_growth": ("NY.GDP.MKTP.KD.ZG", "%"),
@@ -11,11 +14,13 @@ WB_INDICATORS = {
 }
 
 
+@instrumented("source.world_bank")
 def fetch_world_bank(country_iso3: str, ttl_seconds: int = 60 * 60 * 24) -> list[dict]:
     now = datetime.now(timezone.utc).isoformat()
     rows: list[dict] = []
+    base = os.getenv("WB_API_BASE", WB_API_BASE).rstrip("/")
     for indicator_id, (code, unit) in WB_INDICATORS.items():
-        url = f"https://api.worldbank.org/v2/country/{country_iso3}/indicator/{code}?format=json&per_page=80"
+        url = f"{base}/country/{country_iso3}/indicator/{code}?format=json&per_page=80"
         payload = fetch_with_cache(url, as_json=True, timeout=20, ttl_seconds=ttl_seconds)
         if not isinstance(payload, list) or len(payload) < 2:
             continue
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable
+
+from .db import get_connection, init_db
+from .metrics import incr, observe
+
+MAX_BATCH = 64
+MAX_DELAY_S = 0.005
+BUSY_RETRIES = 3
+BUSY_BACKOFF_S = 0.05
+
+
+def _is_busy(exc: BaseException) -> bool:
+    return isinstance(exc, sqlite3.OperationalError) and ("locked" in str(exc) or "busy" in str(exc))
+
+
+class _JobConnection:
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self._conn = conn
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        pass
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+
+class DbWriter:
+    def __init__(
+        self,
+        db_path: Path | str,
+        max_batch: int = MAX_BATCH,
+        max_delay_s: float = MAX_DELAY_S,
+        trace: bool | None = None,
+        busy_timeout_s: float | None = None,
+        busy_retries: int = BUSY_RETRIES,
+    ) -> None:
+        self.db_path = str(db_path)
+        self.max_batch = max(1, max_batch)
+        self.max_delay_s = max_delay_s
+        self.busy_timeout_s = busy_timeout_s
+        self.busy_retries = max(0, busy_retries)
+        self.failed_batches = 0
+        self.commits = 0
+        self.jobs = 0
+        self._trace = trace
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._ready = threading.Event()
+        self._startup_error: BaseException | None = None
+
+    def start(self) -> DbWriter:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._thread.start()
+            self._ready.wait()
+            if self._startup_error is not None:
+                raise self._startup_error
+            atexit.register(self.close)
+        return self
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        if self._thread is None or not self._thread.is_alive():
+            raise RuntimeError("DbWriter is not running")
+        future: Future = Future()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def call(self, fn: Callable, *args, timeout: float | None = None, **kwargs) -> Any:
+        return self.submit(fn, *args, **kwargs).result(timeout)
+
+    def close(self, timeout: float | None = None) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def _open(self) -> sqlite3.Connection:
+        conn = get_connection(self.db_path, trace=self._trace)
+        init_db(conn)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if self.busy_timeout_s is not None:
+            conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_s * 1000)}")
+        conn.isolation_level = None
+        return conn
+
+    def _run(self) -> None:
+        try:
+            conn = self._open()
+        except BaseException as exc:
+            self._startup_error = exc
+            self._ready.set()
+            return
+        self._ready.set()
+        proxy = _JobConnection(conn)
+        try:
+            while True:
+                batch, stop = self._next_batch()
+                if batch:
+                    self._commit_batch(conn, proxy, batch)
+                if stop:
+                    break
+        finally:
+            conn.close()
+
+    def _next_batch(self) -> tuple[list[tuple], bool]:
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay_s
+        while len(batch) < self.max_batch:
+            try:
+                job = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if job is None:
+                return batch, True
+            batch.append(job)
+        return batch, False
+
+    def _begin(self, conn: sqlite3.Connection) -> None:
+        # Other processes (conflict/export/snapshot CLIs) can hold the write lock past the busy timeout.
+        for attempt in range(self.busy_retries + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as exc:
+                if not _is_busy(exc) or attempt == self.busy_retries:
+                    raise
+                incr("writer.busy_retries")
+                time.sleep(BUSY_BACKOFF_S * 2**attempt)
+
+    def _commit_batch(self, conn: sqlite3.Connection, proxy: _JobConnection, batch: list[tuple]) -> None:
+        started = time.perf_counter()
+        outcomes: list[tuple[Future, Any, BaseException | None]] = []
+        try:
+            self._begin(conn)
+            for future, fn, args, kwargs in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                # Each job gets its own savepoint so one failure does not undo the rest of the batch.
+                conn.execute("SAVEPOINT job")
+                try:
+                    result = fn(proxy, *args, **kwargs)
+                except BaseException as exc:
+                    conn.execute("ROLLBACK TO job")
+                    outcomes.append((future, None, exc))
+                else:
+                    outcomes.append((future, result, None))
+                conn.execute("RELEASE job")
+            conn.execute("COMMIT")
+        except BaseException as exc:
+            # Nothing in the batch was committed: fail every job in it and keep the writer serving.
+            if conn.in_transaction:
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+            outcomes = [
+                (future, None, exc)
+                for future, _, _, _ in batch
+                if future.running() or future.set_running_or_notify_cancel()
+            ]
+            self.failed_batches += 1
+            incr("writer.failed_batches")
+        else:
+            self.commits += 1
+            incr("writer.commits")
+        self.jobs += len(outcomes)
+        incr("writer.jobs", len(outcomes))
+        observe("writer.batch", time.perf_counter() - started)
+        # Callers are acknowledged only after the group commit that contains their job.
+        for future, result, exc in outcomes:
+            if exc is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc)
@@ -1,20 +1,77 @@
 from __future__ import annotations
 
-import json
 import os
+import tempfile
+import time
+from pathlib import Path
 
 import pandas as pd
 import plotly.express as px
 import streamlit as st
 
-from src.alerts import add_alert_rule, evaluate_alerts, list_alert_events
-from src.db import get_connection, get_db_path, get_latest_ingestion_run, init_db, query_country_values
+from src.alerts import (
+    RULE_KINDS,
+    add_alert_rule,
+    compact_alert_events,
+    count_alert_events,
+    evaluate_alerts,
+    list_alert_events,
+)
+from src.cache import freshness_states
+from src.circuit import breaker_states
+from src.db import (
+    get_connection,
+    get_db_path,
+    get_latest_ingestion_run,
+    init_db,
+    query_country_values,
+    resolve_db_path,
+    tracing_enabled,
+)
+from src.downsample import downsample_minmax
+from src.export import EXPORT_FORMATS, export_file_name, export_values
 from src.ingest import ingest_country
+from src.metrics import observe, snapshot, to_json, to_prometheus
+from src.peers import PeerIndex
+from src.profiling import RerunProfiler, profiling_enabled, save_profile
 from src.scenarios import record_scenario, simulate
-from src.scoring import compute_scores
+from src.scoring import compute_scores, score_trend
+from src.snapshot import seed_from_snapshot
 from src.utils import country_display_name, deterministic_summary, ordered_countries
+from src.writer import DbWriter
 
 st.set_page_config(page_title="Food Security Early Warning", layout="wide")
+rerun_started = time.perf_counter()
+
+stale_profiler = st.session_state.pop("active_profiler", None)
+if stale_profiler is not None:
+    stale_profiler.stop()
+if profiling_enabled() or st.session_state.get("profile_reruns"):
+    st.session_state["active_profiler"] = RerunProfiler().start()
+
+
+def finish_profiling(label: str) -> None:
+    profiler = st.session_state.pop("active_profiler", None)
+    if profiler is not None:
+        st.session_state["last_profile"] = save_profile(profiler.stop(), label)
+
+
+def end_rerun(action) -> None:
+    finish_profiling(f"{page_key}_{country}")
+    action()
+
+
+EXPORT_PREVIEW_ROWS = 500
+ALERT_PAGE_SIZE = 50
+CHART_POINTS_RANGE = (50, 20000)
+# Clamped so an out-of-range env value cannot make the sidebar number_input raise.
+CHART_MAX_POINTS = min(max(int(os.getenv("CHART_MAX_POINTS", "1000")), CHART_POINTS_RANGE[0]), CHART_POINTS_RANGE[1])
+ALERT_RETENTION_DAYS = int(os.getenv("ALERT_RETENTION_DAYS", "365"))
+ALERT_KIND_HELP = (
+    "threshold: latest value vs threshold; delta: change vs N periods earlier; "
+    "pct_change: % change vs N periods earlier; moving_average: mean of the last N values; "
+    "consecutive: last N values all beyond the threshold"
+)
 
 I18N = {
     "EN": {
@@ -27,6 +84,13 @@ I18N = {
         "mode": "Ingestion mode",
         "date_range": "Date range",
         "indicators": "Indicators",
+        "normalization": "Score baseline",
+        "norm_full": "Full window",
+        "norm_rolling": "Rolling",
+        "rolling_window": "Rolling window (observations per indicator)",
+        "chart_points": "Max chart points per series",
+        "norm_peer": "Peer percentile",
+        "peer_count": "Countries in peer set",
         "dashboard": "Country Dashboard",
         "alerts": "Alerts",
         "sim": "Scenario Simulator",
@@ -46,11 +110,33 @@ I18N = {
         "rule_saved": "Alert rule saved",
         "eval_alerts": "Evaluate alerts on latest data",
         "triggered": "Triggered alerts",
-        "download_csv": "Download CSV",
-        "download_json": "Download JSON",
+        "alert_events_total": "Stored alert events",
+        "alert_page": "page",
+        "newer": "Newer",
+        "older": "Older",
+        "download": "Download",
+        "export_countries": "Countries to export",
+        "export_all_dates": "Ignore date range (full history)",
+        "export_format": "Format",
+        "export_prepare": "Prepare export",
+        "export_rows": "Rows exported",
         "health": "Health check",
         "db_path": "DB path",
         "last_ingest": "Last ingestion",
+        "perf_timers": "Stage timings (last rerun / cumulative)",
+        "perf_counters": "Counters",
+        "download_metrics_json": "Metrics JSON",
+        "download_metrics_prom": "Metrics (Prometheus)",
+        "top_queries": "Top SQL statements by total time",
+        "slow_queries": "Slow queries",
+        "upstream_circuits": "Upstream circuit breakers",
+        "cache_freshness": "Source cache freshness",
+        "profile_reruns": "Profile reruns",
+        "profile_env": "Profiling is on for every rerun (APP_PROFILE=1)",
+        "profile_last": "Last profiled rerun",
+        "profile_top": "Top functions by cumulative time",
+        "download_pstats": "Profile (pstats)",
+        "download_collapsed": "Collapsed stacks (flame graph)",
     },
     "AR": {
         "app_title": "نظام إنذار الأمن الغذائي",
@@ -62,6 +148,13 @@ I18N = {
         "mode": "وضع جلب البيانات",
         "date_range": "النطاق الزمني",
         "indicators": "المؤشرات",
+        "normalization": "أساس الدرجة",
+        "norm_full": "كامل الفترة",
+        "norm_rolling": "نافذة متحركة",
+        "rolling_window": "حجم النافذة المتحركة (عدد المشاهدات لكل مؤشر)",
+        "chart_points": "الحد الأقصى لنقاط الرسم لكل سلسلة",
+        "norm_peer": "مقارنة بالدول الأخرى",
+        "peer_count": "عدد الدول في مجموعة المقارنة",
         "dashboard": "لوحة الدولة",
         "alerts": "التنبيهات",
         "sim": "محاكاة السيناريو",
@@ -81,22 +174,68 @@ I18N = {
         "rule_saved": "تم حفظ قاعدة التنبيه",
         "eval_alerts": "تقييم التنبيهات على أحدث البيانات",
         "triggered": "التنبيهات المفعلة",
-        "download_csv": "تنزيل CSV",
-        "download_json": "تنزيل JSON",
+        "alert_events_total": "أحداث التنبيه المحفوظة",
+        "alert_page": "صفحة",
+        "newer": "الأحدث",
+        "older": "الأقدم",
+        "download": "تنزيل",
+        "export_countries": "الدول المراد تصديرها",
+        "export_all_dates": "تجاهل النطاق الزمني (السجل الكامل)",
+        "export_format": "الصيغة",
+        "export_prepare": "تجهيز التصدير",
+        "export_rows": "عدد الصفوف المصدرة",
         "health": "فحص الصحة",
         "db_path": "مسار قاعدة البيانات",
         "last_ingest": "آخر جلب بيانات",
+        "perf_timers": "توقيت المراحل (آخر تشغيل / تراكمي)",
+        "perf_counters": "العدادات",
+        "download_metrics_json": "المقاييس JSON",
+        "download_metrics_prom": "المقاييس (Prometheus)",
+        "top_queries": "أكثر استعلامات SQL استهلاكا للوقت",
+        "slow_queries": "الاستعلامات البطيئة",
+        "upstream_circuits": "قواطع الدائرة للمصادر الخارجية",
+        "cache_freshness": "حداثة ذاكرة المصادر المؤقتة",
+        "profile_reruns": "تحليل أداء عمليات إعادة التشغيل",
+        "profile_env": "تحليل الأداء مفعل لكل إعادة تشغيل (APP_PROFILE=1)",
+        "profile_last": "آخر إعادة تشغيل تم تحليلها",
+        "profile_top": "أعلى الدوال حسب الوقت التراكمي",
+        "download_pstats": "ملف التحليل (pstats)",
+        "download_collapsed": "المكدسات المطوية (رسم اللهب)",
     },
 }
 
-conn = get_connection()
+db_path = resolve_db_path()
+seed_from_snapshot(db_path)
+conn = get_connection(db_path)
 init_db(conn)
 
+
+@st.cache_resource
+def get_writer(db_path: str) -> DbWriter:
+    return DbWriter(db_path).start()
+
+
+@st.cache_resource
+def load_peer_index(db_path: str) -> PeerIndex:
+    # Scans value_facts on the first peer-percentile lookup, not on cold start.
+    return PeerIndex.deferred(db_path)
+
+
+@st.cache_resource
+def compact_alert_history(db_path: str) -> dict:
+    return get_writer(db_path).call(compact_alert_events, retention_days=ALERT_RETENTION_DAYS)
+
+
+writer = get_writer(get_db_path(conn))
+peer_index = load_peer_index(get_db_path(conn))
+compact_alert_history(get_db_path(conn))
+
 st.sidebar.title("🌍 Food Security")
 lang = st.sidebar.segmented_control("Language / اللغة", options=["EN", "AR"], default="EN")
 T = I18N[lang]
 
 page = st.sidebar.radio(T["page"], [T["dashboard"], T["alerts"], T["sim"], T["export"]])
+page_key = {T["dashboard"]: "dashboard", T["alerts"]: "alerts", T["sim"]: "sim", T["export"]: "export"}[page]
 
 try:
     demo_country_list = pd.read_csv("data/demo/indicators_values.csv")["country_iso3"].dropna().unique().tolist()
@@ -114,14 +253,14 @@ country = st.sidebar.selectbox(
 demo_mode = st.sidebar.toggle(T["demo"], value=os.getenv("DEMO_MODE", "0") == "1")
 ttl_hours = int(st.sidebar.slider(T["ttl"], min_value=1, max_value=168, value=24, step=1))
 
-status = ingest_country(conn, country, demo_mode=demo_mode, ttl_hours=ttl_hours)
+status = ingest_country(conn, country, demo_mode=demo_mode, ttl_hours=ttl_hours, peer_index=peer_index, reuse_fresh=True, writer=writer)
 st.sidebar.caption(f"{T['mode']}: {status}")
 
 rows = [dict(r) for r in query_country_values(conn, country)]
 df = pd.DataFrame(rows)
 if df.empty:
     st.warning("No data available.")
-    st.stop()
+    end_rerun(st.stop)
 
 df["date"] = pd.to_datetime(df["date"])
 min_date = df["date"].min().date()
@@ -134,6 +273,14 @@ else:
 
 indicator_options = sorted(df["indicator_id"].unique().tolist())
 selected_indicators = st.sidebar.multiselect(T["indicators"], indicator_options, default=indicator_options[: min(5, len(indicator_options))])
+normalization = st.sidebar.radio(T["normalization"], [T["norm_full"], T["norm_rolling"], T["norm_peer"]], horizontal=True)
+baseline_window = None
+score_peers = None
+if normalization == T["norm_rolling"]:
+    baseline_window = int(st.sidebar.number_input(T["rolling_window"], min_value=2, max_value=600, value=24, step=1))
+elif normalization == T["norm_peer"]:
+    score_peers = peer_index
+chart_points = int(st.sidebar.number_input(T["chart_points"], min_value=CHART_POINTS_RANGE[0], max_value=CHART_POINTS_RANGE[1], value=CHART_MAX_POINTS, step=50))
 
 fdf = df[(df["date"].dt.date >= start_date) & (df["date"].dt.date <= end_date)].copy()
 if selected_indicators:
@@ -141,12 +288,15 @@ if selected_indicators:
 
 if fdf.empty:
     st.warning("No data after filtering.")
-    st.stop()
+    end_rerun(st.stop)
 
 latest_idx = fdf.groupby("indicator_id")["date"].idxmax()
 latest_rows = fdf.loc[latest_idx].to_dict("records")
-score_pack = compute_scores(fdf.to_dict("records"), latest_rows)
-alert_count = len(list_alert_events(conn, country))
+score_pack = compute_scores(fdf.to_dict("records"), latest_rows, baseline_window=baseline_window, peer_index=score_peers)
+if score_peers is not None:
+    peer_counts = [score_peers.peer_count(r["indicator_id"], r["date"]) for r in latest_rows]
+    st.sidebar.caption(f"{T['peer_count']}: {max(peer_counts, default=0)}")
+alert_count = count_alert_events(conn, country)
 summary = deterministic_summary(country, score_pack["overall_risk"], [k for k, _ in score_pack["contributors"]], alert_count)
 last_run = get_latest_ingestion_run(conn, country)
 db_path = get_db_path(conn)
@@ -159,6 +309,98 @@ with st.expander(T["health"], expanded=True):
         st.write(f"{T['last_ingest']}: `{last_run['ingested_at']}` ({last_run['mode']})")
     else:
         st.write(f"{T['last_ingest']}: n/a")
+    perf = snapshot()
+    if perf["timers"]:
+        st.write(T["perf_timers"])
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {
+                        "stage": name,
+                        "calls": int(stats["count"]),
+                        "last_ms": round(stats["last_s"] * 1000, 2),
+                        "mean_ms": round(stats["mean_s"] * 1000, 2),
+                        "max_ms": round(stats["max_s"] * 1000, 2),
+                        "total_s": round(stats["total_s"], 3),
+                    }
+                    for name, stats in sorted(perf["timers"].items())
+                ]
+            ),
+            use_container_width=True,
+            hide_index=True,
+        )
+    if perf["counters"]:
+        st.write(T["perf_counters"])
+        st.dataframe(pd.DataFrame(sorted(perf["counters"].items()), columns=["counter", "value"]), use_container_width=True, hide_index=True)
+    freshness = freshness_states()
+    if freshness:
+        st.write(T["cache_freshness"])
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {"url": f["url"], "state": f["state"], "checked_s_ago": round(time.time() - f["checked_at"], 1)}
+                    for f in freshness
+                ]
+            ),
+            use_container_width=True,
+            hide_index=True,
+        )
+    circuits = breaker_states()
+    if circuits:
+        st.write(T["upstream_circuits"])
+        st.dataframe(pd.DataFrame(circuits), use_container_width=True, hide_index=True)
+    m1, m2 = st.columns(2)
+    m1.download_button(T["download_metrics_json"], data=to_json(perf).encode("utf-8"), file_name="metrics.json", mime="application/json")
+    m2.download_button(T["download_metrics_prom"], data=to_prometheus(perf).encode("utf-8"), file_name="metrics.prom", mime="text/plain")
+    if profiling_enabled():
+        st.caption(T["profile_env"])
+    else:
+        st.toggle(T["profile_reruns"], key="profile_reruns")
+    last_profile = st.session_state.get("last_profile")
+    if last_profile:
+        st.write(f"{T['profile_last']}: `{last_profile['label']}` ({last_profile['elapsed_s']} s, {last_profile['samples']} samples)")
+        if last_profile["top"]:
+            st.write(T["profile_top"])
+            st.dataframe(pd.DataFrame(last_profile["top"]), use_container_width=True, hide_index=True)
+        pf1, pf2 = st.columns(2)
+        if last_profile["pstats_path"] and Path(last_profile["pstats_path"]).exists():
+            pf1.download_button(
+                T["download_pstats"],
+                data=Path(last_profile["pstats_path"]).read_bytes(),
+                file_name=Path(last_profile["pstats_path"]).name,
+                mime="application/octet-stream",
+            )
+        if Path(last_profile["collapsed_path"]).exists():
+            pf2.download_button(
+                T["download_collapsed"],
+                data=Path(last_profile["collapsed_path"]).read_bytes(),
+                file_name=Path(last_profile["collapsed_path"]).name,
+                mime="text/plain",
+            )
+    if tracing_enabled():
+        st.write(T["top_queries"])
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {
+                        "sql": q["sql"],
+                        "calls": q["calls"],
+                        "rows": q["rows"],
+                        "total_ms": round(q["total_s"] * 1000, 2),
+                        "mean_ms": round(q["mean_s"] * 1000, 3),
+                        "max_ms": round(q["max_s"] * 1000, 2),
+                    }
+                    for q in conn.trace_stats.top(10)
+                ]
+            ),
+            use_container_width=True,
+            hide_index=True,
+        )
+        if conn.trace_stats.slow:
+            st.write(T["slow_queries"])
+            st.json(list(conn.trace_stats.slow)[-10:], expanded=False)
+
+page_started = time.perf_counter()
 
 if page == T["dashboard"]:
     c1, c2, c3, c4 = st.columns(4)
@@ -168,16 +410,11 @@ if page == T["dashboard"]:
     c4.metric(T["macro"], round(score_pack["category_scores"].get("macro", 0.0), 2))
 
     st.info(summary)
-    st.plotly_chart(px.line(fdf, x="date", y="value", color="indicator_id", title=T["timeseries"]), use_container_width=True)
-
-    dates = sorted(fdf["date"].unique())
-    trend_scores = []
-    for date_value in dates:
-        drows = fdf[fdf["date"] <= date_value]
-        lidx = drows.groupby("indicator_id")["date"].idxmax()
-        lrows = drows.loc[lidx].to_dict("records")
-        trend_scores.append(compute_scores(drows.to_dict("records"), lrows)["overall_risk"])
-    trend_df = pd.DataFrame({"date": dates, "overall_risk": trend_scores})
+    chart_df = downsample_minmax(fdf, max_points=chart_points)
+    st.plotly_chart(px.line(chart_df, x="date", y="value", color="indicator_id", title=T["timeseries"]), use_container_width=True)
+
+    trend_df = pd.DataFrame(score_trend(fdf.to_dict("records"), baseline_window=baseline_window, peer_index=score_peers), columns=["date", "overall_risk"])
+    trend_df = downsample_minmax(trend_df, y="overall_risk", group=None, max_points=chart_points)
     st.plotly_chart(px.area(trend_df, x="date", y="overall_risk", title=T["score_trend"]), use_container_width=True)
 
     cat_df = pd.DataFrame([{"category": k, "score": v} for k, v in score_pack["category_scores"].items()])
@@ -205,17 +442,29 @@ elif page == T["alerts"]:
     st.subheader(T["alerts"])
     with st.form("create_alert"):
         indicator = st.selectbox("Indicator", sorted(df["indicator_id"].unique().tolist()))
+        kind = st.selectbox("Rule kind", list(RULE_KINDS), help=ALERT_KIND_HELP)
         direction = st.selectbox("Direction", ["above", "below"])
         threshold = st.number_input("Threshold", value=50.0)
+        periods = st.number_input("Periods", min_value=1, max_value=120, value=1, step=1)
         if st.form_submit_button("Save"):
-            add_alert_rule(conn, country, indicator, direction, threshold)
+            writer.call(add_alert_rule, country, indicator, direction, threshold, kind=kind, periods=int(periods))
             st.success(T["rule_saved"])
 
     if st.button(T["eval_alerts"]):
-        hits = evaluate_alerts(conn, country)
+        hits = writer.call(evaluate_alerts, country)
         st.info(f"{T['triggered']}: {len(hits)}")
 
-    st.dataframe(pd.DataFrame(list_alert_events(conn, country)), use_container_width=True)
+    cursors = st.session_state.setdefault("alert_event_cursors", {}).setdefault(country, [None])
+    events = list_alert_events(conn, country, limit=ALERT_PAGE_SIZE, before=cursors[-1])
+    st.caption(f"{T['alert_events_total']}: {alert_count} · {T['alert_page']} {len(cursors)}")
+    st.dataframe(pd.DataFrame(events), use_container_width=True)
+    p1, p2 = st.columns(2)
+    if p1.button(T["newer"], disabled=len(cursors) == 1):
+        cursors.pop()
+        end_rerun(st.rerun)
+    if p2.button(T["older"], disabled=len(events) < ALERT_PAGE_SIZE):
+        cursors.append((events[-1]["triggered_at"], events[-1]["event_id"]))
+        end_rerun(st.rerun)
 
 elif page == T["sim"]:
     st.subheader(T["sim"])
@@ -225,8 +474,8 @@ elif page == T["sim"]:
 
     before = pd.DataFrame(latest_rows)
     after = pd.DataFrame(simulate(latest_rows, shock, severity, horizon))
-    before_score = compute_scores(fdf.to_dict("records"), before.to_dict("records"))["overall_risk"]
-    after_score = compute_scores(fdf.to_dict("records"), after.to_dict("records"))["overall_risk"]
+    before_score = compute_scores(fdf.to_dict("records"), before.to_dict("records"), baseline_window=baseline_window, peer_index=score_peers)["overall_risk"]
+    after_score = compute_scores(fdf.to_dict("records"), after.to_dict("records"), baseline_window=baseline_window, peer_index=score_peers)["overall_risk"]
 
     merged = before[["indicator_id", "value"]].merge(after[["indicator_id", "value"]], on="indicator_id", suffixes=("_before", "_after"))
     melted = merged.melt(id_vars=["indicator_id"], var_name="state", value_name="value")
@@ -235,12 +484,33 @@ elif page == T["sim"]:
     c1, c2 = st.columns(2)
     c1.metric("Before score", before_score)
     c2.metric("After score", after_score)
-    record_scenario(conn, country, shock, float(severity), int(horizon))
+    writer.submit(record_scenario, country, shock, float(severity), int(horizon))
     st.write(f"Scenario impact: risk moved from {before_score:.2f} to {after_score:.2f}.")
 
 else:
     st.subheader(T["export"])
     export_df = fdf.sort_values(["date", "indicator_id"])
-    st.dataframe(export_df, use_container_width=True)
-    st.download_button(T["download_csv"], data=export_df.to_csv(index=False).encode("utf-8"), file_name=f"{country.lower()}_filtered.csv", mime="text/csv")
-    st.download_button(T["download_json"], data=json.dumps(export_df.to_dict("records"), default=str, indent=2).encode("utf-8"), file_name=f"{country.lower()}_filtered.json", mime="application/json")
+    st.dataframe(export_df.head(EXPORT_PREVIEW_ROWS), use_container_width=True)
+
+    export_countries = st.multiselect(T["export_countries"], country_options, default=[country], format_func=lambda iso: country_display_name(iso, lang))
+    export_all_dates = st.checkbox(T["export_all_dates"], value=False)
+    export_format = st.selectbox(T["export_format"], list(EXPORT_FORMATS))
+    if st.button(T["export_prepare"]):
+        export_filters = {
+            "countries": export_countries,
+            "indicators": selected_indicators,
+            "start_date": None if export_all_dates else start_date.isoformat(),
+            "end_date": None if export_all_dates else end_date.isoformat(),
+        }
+        export_name = export_file_name(export_countries, export_format)
+        with tempfile.TemporaryDirectory() as export_dir:
+            export_path = Path(export_dir) / export_name
+            with export_path.open("wb") as export_fp:
+                exported = export_values(conn, export_fp, export_format, **export_filters)
+            st.caption(f"{T['export_rows']}: {exported}")
+            with export_path.open("rb") as export_fp:
+                st.download_button(T["download"], data=export_fp, file_name=export_name, mime=EXPORT_FORMATS[export_format][1])
+
+observe(f"render.{page_key}", time.perf_counter() - page_started)
+observe("render.rerun", time.perf_counter() - rerun_started)
+finish_profiling(f"{page_key}_{country}")
@@ -0,0 +1,60 @@
+from benchmarks.loadtest import percentile, run_loadtest, stub_upstream
+from benchmarks.run import SCALES, compare, run_suite
+from benchmarks.synthetic import generate_values
+from src import cache
+from src.sources_food import fetch_food_source
+from src.sources_worldbank import fetch_world_bank
+
+
+def test_generate_values_is_seeded_and_sized():
+    a = generate_values(2, 3, 12, seed=1)
+    b = generate_values(2, 3, 12, seed=1)
+    assert a == b
+    assert len(a) == 2 * 3 * 12
+    assert a != generate_values(2, 3, 12, seed=2)
+
+
+def test_run_suite_reports_all_hot_paths(tmp_path):
+    out = run_suite(SCALES["tiny"], repeat=1, workdir=tmp_path)
+    assert set(out["results"]) == {
+        "upsert_values",
+        "query_country_values",
+        "compute_scores",
+        "score_trend",
+        "simulate",
+        "evaluate_alerts",
+        "cache_get",
+    }
+    assert all(r["median_s"] >= 0 for r in out["results"].values())
+
+
+def test_compare_flags_regressions():
+    baseline = {"results": {"score_trend": {"median_s": 0.1}, "simulate": {"median_s": 0.1}}}
+    current = {"results": {"score_trend": {"median_s": 0.5}, "simulate": {"median_s": 0.11}}}
+    regressions = compare(current, baseline, tolerance=1.5)
+    assert [r["benchmark"] for r in regressions] == ["score_trend"]
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 95) == 0.0
+
+
+def test_stub_upstream_feeds_live_sources(monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    with stub_upstream() as base:
+        monkeypatch.setenv("WB_API_BASE", f"{base}/v2")
+        monkeypatch.setenv("OWID_FOOD_URL", f"{base}/owid/undernourishment.csv")
+        assert {r["indicator_id"] for r in fetch_world_bank("KEN")} == {"inflation", "gdp_growth", "unemployment"}
+        assert fetch_food_source("KEN")
+
+
+def test_loadtest_reports_latency_and_errors(tmp_path):
+    report = run_loadtest(sessions=2, iterations=1, workdir=tmp_path)
+    assert report["reruns"] == 4
+    assert report["errors"] == 0
+    assert report["lock_errors"] == 0
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"]
+    assert report["ingestion_modes"].get("live")
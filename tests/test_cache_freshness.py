@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+
+import pytest
+
+from src import cache
+from src.circuit import reset_breakers
+from src.db import get_connection, init_db
+from src.ingest import ingest_country
+
+URL = 'https://api.example.org/series'
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+        self.content = json.dumps(data).encode()
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+@pytest.fixture(autouse=True)
+def _isolate(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path / 'cache')
+    reset_breakers()
+    cache.negative_clear()
+    yield
+    cache.wait_for_refreshes(5)
+
+
+def _store(data, age_seconds):
+    cache.cache_set(cache.CACHE_DIR, URL, data)
+    path = cache._cache_file(cache.CACHE_DIR, URL)
+    payload = json.loads(path.read_text(encoding='utf-8'))
+    payload['stored_at'] = time.time() - age_seconds
+    path.write_text(json.dumps(payload), encoding='utf-8')
+
+
+def _state():
+    return {s['url']: s['state'] for s in cache.freshness_states()}[URL]
+
+
+def test_stale_entry_is_served_while_refreshing(monkeypatch):
+    _store({'v': 'old'}, age_seconds=120)
+    monkeypatch.setattr('requests.get', lambda url, timeout: FakeResponse({'v': 'new'}))
+
+    with cache.track_freshness() as seen:
+        assert cache.fetch_with_cache(URL, ttl_seconds=60, stale_grace_seconds=600) == {'v': 'old'}
+    assert seen == {URL: cache.REVALIDATING}
+
+    cache.wait_for_refreshes(5)
+    with cache.track_freshness() as seen:
+        assert cache.fetch_with_cache(URL, ttl_seconds=60, stale_grace_seconds=600) == {'v': 'new'}
+    assert seen == {URL: cache.FRESH}
+    assert _state() == cache.FRESH
+
+
+def test_refresh_is_single_flight(monkeypatch):
+    _store({'v': 'old'}, age_seconds=120)
+    release = threading.Event()
+    calls = []
+
+    def slow_get(url, timeout):
+        calls.append(url)
+        release.wait(5)
+        return FakeResponse({'v': 'new'})
+
+    monkeypatch.setattr('requests.get', slow_get)
+    for _ in range(5):
+        assert cache.fetch_with_cache(URL, ttl_seconds=60, stale_grace_seconds=600) == {'v': 'old'}
+    release.set()
+    cache.wait_for_refreshes(5)
+    assert calls == [URL]
+
+
+def test_entry_past_grace_blocks_on_fetch(monkeypatch):
+    _store({'v': 'old'}, age_seconds=1000)
+    monkeypatch.setattr('requests.get', lambda url, timeout: FakeResponse({'v': 'new'}))
+    assert cache.fetch_with_cache(URL, ttl_seconds=60, stale_grace_seconds=600) == {'v': 'new'}
+
+
+def test_failed_refresh_marks_entry_stale(monkeypatch):
+    _store({'v': 'old'}, age_seconds=120)
+
+    def down(url, timeout):
+        raise ConnectionError('down')
+
+    monkeypatch.setattr('requests.get', down)
+    monkeypatch.setattr(cache.time, 'sleep', lambda s: None)
+    assert cache.fetch_with_cache(URL, ttl_seconds=60, stale_grace_seconds=600) == {'v': 'old'}
+    cache.wait_for_refreshes(5)
+    assert _state() == cache.STALE
+
+
+def test_ingest_reports_live_stale(monkeypatch):
+    _store([{}, [{'value': 1.5, 'date': '2020'}]], age_seconds=120)
+    monkeypatch.setattr('requests.get', lambda url, timeout: FakeResponse([{}, []]))
+
+    def stale_wb(country, ttl_seconds):
+        cache.fetch_with_cache(URL, ttl_seconds=60, stale_grace_seconds=600)
+        return []
+
+    monkeypatch.setattr('src.ingest.fetch_world_bank', stale_wb)
+    monkeypatch.setattr('src.ingest.fetch_food_source', lambda country, ttl_seconds: [])
+    conn = get_connection(':memory:')
+    init_db(conn)
+    assert ingest_country(conn, 'KEN') == 'live_stale'
+
+
+def test_corrupt_cache_file_is_a_miss():
+    path = cache._cache_file(cache.CACHE_DIR, URL)
+    path.parent.mkdir(parents=True)
+    path.write_text('{"stored_at": 1', encoding='utf-8')
+    assert cache.cache_get(cache.CACHE_DIR, URL, 3600) is None
+    assert cache.cache_read(cache.CACHE_DIR, URL) is None
+
+
+def test_cache_set_never_exposes_partial_file():
+    cache.cache_set(cache.CACHE_DIR, URL, {'v': 0})
+    stop = threading.Event()
+    misses = []
+
+    def _reader():
+        while not stop.is_set():
+            try:
+                if cache.cache_read(cache.CACHE_DIR, URL) is None:
+                    misses.append('miss')
+            except ValueError as exc:
+                misses.append(exc)
+
+    reader = threading.Thread(target=_reader)
+    reader.start()
+    try:
+        for i in range(200):
+            cache.cache_set(cache.CACHE_DIR, URL, {'v': i, 'rows': list(range(2000))})
+    finally:
+        stop.set()
+        reader.join()
+    assert not misses
+    assert cache.cache_read(cache.CACHE_DIR, URL)[0]['v'] == 199
+    assert list(cache.CACHE_DIR.glob('*.tmp')) == []
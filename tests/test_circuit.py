@@ -0,0 +1,89 @@
+import pytest
+import requests
+
+from src import cache
+from src.circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, breaker_states, reset_breakers
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def _isolate(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path / 'cache')
+    reset_breakers()
+    cache.negative_clear()
+    yield
+    reset_breakers()
+    cache.negative_clear()
+
+
+def test_breaker_opens_then_half_opens_after_cooldown():
+    clock = FakeClock()
+    breaker = CircuitBreaker('example.org', failure_threshold=2, cooldown_seconds=30, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    clock.now = 31
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now = 62
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_outage_fails_fast_after_threshold(monkeypatch):
+    calls = []
+
+    def down(url, timeout):
+        calls.append(url)
+        raise requests.ConnectionError('down')
+
+    monkeypatch.setattr('requests.get', down)
+    monkeypatch.setattr(cache.time, 'sleep', lambda s: None)
+
+    with pytest.raises(requests.ConnectionError):
+        cache.fetch_with_cache('https://api.example.org/a', retries=5)
+    assert len(calls) == 3
+
+    with pytest.raises(CircuitOpenError):
+        cache.fetch_with_cache('https://api.example.org/b')
+    assert len(calls) == 3
+    assert breaker_states()[0]['state'] == OPEN
+
+
+def test_failures_are_negatively_cached(monkeypatch):
+    calls = []
+
+    class NotFound:
+        status_code = 404
+        content = b''
+
+        def raise_for_status(self):
+            raise requests.HTTPError('404', response=self)
+
+    def missing(url, timeout):
+        calls.append(url)
+        return NotFound()
+
+    monkeypatch.setattr('requests.get', missing)
+    with pytest.raises(requests.HTTPError):
+        cache.fetch_with_cache('https://api.example.org/missing', retries=1)
+    with pytest.raises(RuntimeError, match='recent failure'):
+        cache.fetch_with_cache('https://api.example.org/missing', retries=1)
+    assert len(calls) == 1
+    assert breaker_states()[0]['state'] == CLOSED
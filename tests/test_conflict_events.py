@@ -0,0 +1,180 @@
+import pandas as pd
+
+from src.db import get_connection, init_db, upsert_meta
+from src.ingest import ingest_country
+from src.sources_conflict import aggregate_events, ingest_conflict_events, iter_parquet_event_chunks, load_demo_data
+
+HEADER = 'event_id,event_date,iso3,fatalities,notes\n'
+
+
+def _conn():
+    conn = get_connection(':memory:')
+    init_db(conn)
+    upsert_meta(conn, load_demo_data()[0])
+    return conn
+
+
+def _series(conn, country, indicator_id):
+    return dict(
+        conn.execute(
+            'SELECT date, value FROM indicators_values WHERE country_iso3 = ? AND indicator_id = ? ORDER BY date',
+            (country, indicator_id),
+        ).fetchall()
+    )
+
+
+def test_aggregate_events_counts_per_country_month():
+    chunk = pd.DataFrame(
+        {
+            'iso3': ['ken', 'KEN', 'KEN', 'SDN', None],
+            'event_date': ['2024-01-03', '2024-01-30', '2024-02-01', '2024-01-15', '2024-01-01'],
+            'fatalities': [1, 2, None, 5, 9],
+        }
+    )
+    out = aggregate_events(chunk).sort_values(['country_iso3', 'day']).to_dict('records')
+    assert out == [
+        {'country_iso3': 'KEN', 'day': 20240101, 'events': 2, 'fatalities': 3.0},
+        {'country_iso3': 'KEN', 'day': 20240201, 'events': 1, 'fatalities': 0.0},
+        {'country_iso3': 'SDN', 'day': 20240101, 'events': 1, 'fatalities': 5.0},
+    ]
+
+
+def test_csv_ingestion_reads_only_the_appended_tail(tmp_path):
+    path = tmp_path / 'events.csv'
+    path.write_text(
+        HEADER
+        + '1,2024-01-03,KEN,1,"line one\nline two"\n'
+        + '2,2024-01-20,KEN,2,x\n'
+        + '3,2024-02-11,KEN,0,x\n'
+        + '4,2024-02-12,SDN,4,x\n',
+        encoding='utf-8',
+    )
+    conn = _conn()
+    first = ingest_conflict_events(conn, path, chunk_rows=2)
+    assert first['events'] == 4
+    assert _series(conn, 'KEN', 'conflict_events') == {'2024-01-01': 2.0, '2024-02-01': 1.0}
+    assert _series(conn, 'KEN', 'conflict_fatalities') == {'2024-01-01': 3.0, '2024-02-01': 0.0}
+
+    with path.open('a', encoding='utf-8') as fp:
+        fp.write('5,2024-02-28,KEN,7,x\n6,2024-03-01,KEN,1,partial')
+    second = ingest_conflict_events(conn, path, chunk_rows=2)
+    assert second['events'] == 1
+    assert _series(conn, 'KEN', 'conflict_events') == {'2024-01-01': 2.0, '2024-02-01': 2.0}
+
+    with path.open('a', encoding='utf-8') as fp:
+        fp.write(' row\n')
+    assert ingest_conflict_events(conn, path)['events'] == 1
+    assert ingest_conflict_events(conn, path)['events'] == 0
+    assert _series(conn, 'KEN', 'conflict_events')['2024-03-01'] == 1.0
+    assert _series(conn, 'KEN', 'conflict_fatalities')['2024-02-01'] == 7.0
+
+
+def test_finished_csv_without_trailing_newline_ingests_last_row(tmp_path):
+    path = tmp_path / 'events.csv'
+    path.write_text(HEADER + '1,2024-01-03,KEN,1,x\n2,2024-01-04,KEN,2,last', encoding='utf-8')
+    conn = _conn()
+    first = ingest_conflict_events(conn, path)
+    assert (first['events'], first['pending_bytes']) == (1, len('2,2024-01-04,KEN,2,last'))
+    second = ingest_conflict_events(conn, path)
+    assert (second['events'], second['pending_bytes']) == (1, 0)
+    assert second['byte_offset'] == path.stat().st_size
+    assert ingest_conflict_events(conn, path)['events'] == 0
+    assert _series(conn, 'KEN', 'conflict_events') == {'2024-01-01': 2.0}
+    assert _series(conn, 'KEN', 'conflict_fatalities') == {'2024-01-01': 3.0}
+
+
+def test_replaced_csv_is_reprocessed(tmp_path):
+    path = tmp_path / 'events.csv'
+    path.write_text(HEADER + '1,2024-01-03,KEN,1,x\n2,2024-02-03,KEN,1,x\n', encoding='utf-8')
+    conn = _conn()
+    ingest_conflict_events(conn, path)
+    path.write_text(HEADER + '9,2024-01-05,KEN,3,x\n', encoding='utf-8')
+    assert ingest_conflict_events(conn, path)['events'] == 1
+    assert _series(conn, 'KEN', 'conflict_events') == {'2024-01-01': 1.0, '2024-02-01': 0.0}
+    assert _series(conn, 'KEN', 'conflict_fatalities')['2024-01-01'] == 3.0
+
+
+def test_replaced_larger_csv_is_reprocessed(tmp_path):
+    path = tmp_path / 'events.csv'
+    path.write_text(HEADER + '1,2024-01-03,KEN,1,x\n', encoding='utf-8')
+    conn = _conn()
+    ingest_conflict_events(conn, path)
+    path.write_text(HEADER + '7,2024-03-05,KEN,2,a longer replacement row\n8,2024-03-06,KEN,2,x\n', encoding='utf-8')
+    assert ingest_conflict_events(conn, path)['events'] == 2
+    assert _series(conn, 'KEN', 'conflict_events') == {'2024-01-01': 0.0, '2024-03-01': 2.0}
+    assert ingest_conflict_events(conn, path)['events'] == 0
+
+
+def test_replaced_parquet_with_more_rows_is_reprocessed(tmp_path):
+    path = tmp_path / 'events.parquet'
+    pd.DataFrame({'iso3': ['KEN'], 'event_date': ['2024-01-03'], 'fatalities': [1]}).to_parquet(path)
+    conn = _conn()
+    ingest_conflict_events(conn, path)
+    pd.DataFrame({'iso3': ['SDN', 'SDN'], 'event_date': ['2024-01-03', '2024-01-04'], 'fatalities': [2, 2]}).to_parquet(path)
+    assert ingest_conflict_events(conn, path)['events'] == 2
+    assert _series(conn, 'KEN', 'conflict_events') == {'2024-01-01': 0.0}
+    assert _series(conn, 'SDN', 'conflict_events') == {'2024-01-01': 2.0}
+
+
+def test_parquet_ingestion_skips_rows_already_read(tmp_path):
+    path = tmp_path / 'events.parquet'
+    base = pd.DataFrame({'iso3': ['KEN', 'KEN'], 'event_date': ['2024-01-03', '2024-01-09'], 'fatalities': [1, 1]})
+    base.to_parquet(path)
+    conn = _conn()
+    assert ingest_conflict_events(conn, path)['events'] == 2
+
+    extra = pd.DataFrame({'iso3': ['KEN'], 'event_date': ['2024-01-25'], 'fatalities': [4]})
+    pd.concat([base, extra], ignore_index=True).to_parquet(path)
+    assert ingest_conflict_events(conn, path, chunk_rows=1)['events'] == 1
+    assert _series(conn, 'KEN', 'conflict_events') == {'2024-01-01': 3.0}
+    assert _series(conn, 'KEN', 'conflict_fatalities') == {'2024-01-01': 6.0}
+
+
+def test_parquet_ingestion_skips_row_groups_already_read(tmp_path, monkeypatch):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = tmp_path / 'events.parquet'
+    frame = pd.DataFrame({'iso3': ['KEN'] * 10, 'event_date': ['2024-01-03'] * 10, 'fatalities': range(10)})
+    pq.write_table(pa.Table.from_pandas(frame), path, row_group_size=4)
+    read_groups = []
+    iter_batches = pq.ParquetFile.iter_batches
+
+    def spy(self, *args, row_groups=None, **kwargs):
+        read_groups.append(row_groups)
+        return iter_batches(self, *args, row_groups=row_groups, **kwargs)
+
+    monkeypatch.setattr(pq.ParquetFile, 'iter_batches', spy)
+    chunks = list(iter_parquet_event_chunks(path, skip_rows=9, chunk_rows=2))
+    assert read_groups == [[2]]
+    assert pd.concat(chunks)['fatalities'].tolist() == [9]
+    assert list(iter_parquet_event_chunks(path, skip_rows=10)) == []
+    assert pd.concat(iter_parquet_event_chunks(path, skip_rows=4))['fatalities'].tolist() == list(range(4, 10))
+
+
+def test_live_ingestion_keeps_event_aggregates(tmp_path, monkeypatch):
+    path = tmp_path / 'events.csv'
+    path.write_text(HEADER + '1,2024-01-03,KEN,1,x\n', encoding='utf-8')
+    conn = _conn()
+    ingest_conflict_events(conn, path)
+    monkeypatch.setattr('src.ingest.fetch_world_bank', lambda *a, **k: [])
+    monkeypatch.setattr('src.ingest.fetch_food_source', lambda *a, **k: [])
+    assert ingest_country(conn, 'KEN') == 'live'
+    assert _series(conn, 'KEN', 'conflict_events') == {'2024-01-01': 1.0}
+
+
+def test_demo_and_fallback_ingestion_keep_event_aggregates(tmp_path, monkeypatch):
+    path = tmp_path / 'events.csv'
+    path.write_text(HEADER + '1,2024-01-03,KEN,1,x\n', encoding='utf-8')
+    conn = _conn()
+    ingest_conflict_events(conn, path)
+
+    def _outage(*args, **kwargs):
+        raise RuntimeError('upstream down')
+
+    monkeypatch.setattr('src.ingest.fetch_world_bank', _outage)
+    assert ingest_country(conn, 'KEN') == 'fallback_demo'
+    assert _series(conn, 'KEN', 'conflict_events') == {'2024-01-01': 1.0}
+    assert ingest_country(conn, 'KEN', demo_mode=True) == 'demo'
+    assert _series(conn, 'KEN', 'conflict_events') == {'2024-01-01': 1.0}
+    assert _series(conn, 'KEN', 'food_price_stress')
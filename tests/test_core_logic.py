@@ -2,7 +2,7 @@ from pathlib import Path
 
 from src.cache import cache_get, cache_set
 from src.scenarios import simulate
-from src.scoring import compute_scores
+from src.scoring import compute_scores, score_trend, sliding_minmax
 from src.sources_conflict import load_demo_data
 from src.utils import clamp, country_display_name, deterministic_summary, ordered_countries, to_risk_scale
 
@@ -47,6 +47,34 @@ def test_compute_scores_has_explainability():
     assert "weights" in out and "normalized_inputs" in out and "contributors" in out
 
 
+def test_score_trend_one_point_per_date():
+    rows = [
+        {"indicator_id": "inflation", "value": 5, "category": "macro", "date": "2024-01-01"},
+        {"indicator_id": "conflict_events", "value": 10, "category": "conflict", "date": "2024-01-01"},
+        {"indicator_id": "inflation", "value": 15, "category": "macro", "date": "2024-02-01"},
+    ]
+    trend = score_trend(rows)
+    assert [d for d, _ in trend] == ["2024-01-01", "2024-02-01"]
+    assert trend[-1][1] == compute_scores(rows, rows[1:])["overall_risk"]
+
+
+def test_sliding_minmax_window():
+    assert sliding_minmax([3, 1, 4, 1, 5, 9, 2], 3) == [(3, 3), (1, 3), (1, 4), (1, 4), (1, 5), (1, 9), (2, 9)]
+    assert sliding_minmax([3, 1, 4]) == [(3, 3), (1, 3), (1, 4)]
+
+
+def test_rolling_baseline_forgets_old_extremes():
+    rows = [
+        {"indicator_id": "inflation", "value": v, "category": "macro", "date": f"2024-{m:02d}-01"}
+        for m, v in enumerate([100, 10, 12, 14], start=1)
+    ]
+    latest = [rows[-1]]
+    assert compute_scores(rows, latest)["normalized_inputs"]["inflation"] < 10
+    assert compute_scores(rows, latest, baseline_window=3)["normalized_inputs"]["inflation"] == 100.0
+    trend = score_trend(rows, baseline_window=3)
+    assert trend[-1][1] == compute_scores(rows, latest, baseline_window=3)["overall_risk"]
+
+
 def test_simulate_shock_changes_values():
     rows = [{"indicator_id": "inflation", "value": 10.0, "category": "macro"}]
     out = simulate(rows, "currency_depreciation", severity=100, horizon=12)
@@ -1,4 +1,13 @@
-from src.alerts import add_alert_rule, evaluate_alerts
+import pytest
+
+from src.alerts import (
+    add_alert_rule,
+    alert_event_summary,
+    compact_alert_events,
+    count_alert_events,
+    evaluate_alerts,
+    list_alert_events,
+)
 from src.db import get_connection, get_db_path, get_latest_ingestion_run, init_db, upsert_meta, upsert_values
 from src.ingest import ingest_country
 from src.scenarios import record_scenario
@@ -57,6 +66,121 @@ def test_evaluate_alerts_not_triggered():
     assert len(hits) == 0
 
 
+def setup_series(values):
+    conn = setup_conn()
+    upsert_values(
+        conn,
+        [
+            {
+                'country_iso3': 'KEN',
+                'date': f'2024-{m:02d}-01',
+                'indicator_id': 'inflation',
+                'value': v,
+                'unit': '%',
+                'source': 'x',
+                'last_updated': 'now',
+            }
+            for m, v in enumerate(values, start=1)
+        ],
+    )
+    return conn
+
+
+def test_delta_and_pct_change_rules():
+    conn = setup_series([10, 11, 12, 18])
+    delta = add_alert_rule(conn, 'KEN', 'inflation', 'above', 5, kind='delta', periods=2)
+    add_alert_rule(conn, 'KEN', 'inflation', 'above', 70, kind='pct_change', periods=1)
+    pct = add_alert_rule(conn, 'KEN', 'inflation', 'above', 40, kind='pct_change', periods=1)
+    hits = {h['alert_id']: h for h in evaluate_alerts(conn, 'KEN')}
+    assert set(hits) == {delta, pct}
+    assert hits[delta]['observed_value'] == 7
+    assert hits[pct]['observed_value'] == pytest.approx(50.0)
+    assert hits[pct]['date'] == '2024-04-01'
+
+
+def test_moving_average_rule():
+    conn = setup_series([1, 1, 10, 20, 30])
+    above = add_alert_rule(conn, 'KEN', 'inflation', 'above', 19, kind='moving_average', periods=3)
+    add_alert_rule(conn, 'KEN', 'inflation', 'above', 21, kind='moving_average', periods=3)
+    add_alert_rule(conn, 'KEN', 'inflation', 'above', 0, kind='moving_average', periods=9)
+    hits = evaluate_alerts(conn, 'KEN')
+    assert [(h['alert_id'], h['observed_value']) for h in hits] == [(above, 20)]
+
+
+def test_consecutive_breaches_rule():
+    conn = setup_series([20, 5, 15, 16, 17])
+    three = add_alert_rule(conn, 'KEN', 'inflation', 'above', 14, kind='consecutive', periods=3)
+    add_alert_rule(conn, 'KEN', 'inflation', 'above', 14, kind='consecutive', periods=4)
+    hits = evaluate_alerts(conn, 'KEN')
+    assert [(h['alert_id'], h['observed_value']) for h in hits] == [(three, 17)]
+
+
+def test_add_alert_rule_rejects_unknown_kind():
+    conn = setup_conn()
+    with pytest.raises(ValueError):
+        add_alert_rule(conn, 'KEN', 'inflation', 'above', 1, kind='median')
+
+
+def test_reevaluation_collapses_into_one_event():
+    conn = setup_conn()
+    add_alert_rule(conn, 'KEN', 'inflation', 'above', 10)
+    for _ in range(3):
+        assert len(evaluate_alerts(conn, 'KEN')) == 1
+    assert count_alert_events(conn, 'KEN') == 1
+    summary = alert_event_summary(conn, 'KEN')
+    assert summary['events'] == 1 and summary['occurrences'] == 3
+
+
+def test_compact_alert_events_collapses_and_expires():
+    conn = setup_conn()
+    aid = add_alert_rule(conn, 'KEN', 'inflation', 'above', 10)
+    conn.executemany(
+        'INSERT INTO alert_events(alert_id, triggered_at, observed_value, date) VALUES (?,?,?,?)',
+        [
+            (aid, '2026-01-01T00:00:00+00:00', 12.0, '2024-01-01'),
+            (aid, '2026-01-02T00:00:00+00:00', 12.0, '2024-01-01'),
+            (aid, '2026-01-03T00:00:00+00:00', 12.0, '2024-01-01'),
+            (aid, '2000-01-01T00:00:00+00:00', 9.0, '1999-01-01'),
+        ],
+    )
+    out = compact_alert_events(conn, retention_days=3650)
+    assert out == {'collapsed': 1, 'removed': 2, 'expired': 1}
+    events = list_alert_events(conn, 'KEN')
+    assert len(events) == 1
+    assert events[0]['occurrences'] == 3
+    assert events[0]['last_triggered_at'] == '2026-01-03T00:00:00+00:00'
+
+
+def test_list_alert_events_keyset_pagination():
+    conn = setup_conn()
+    aid = add_alert_rule(conn, 'KEN', 'inflation', 'above', 10)
+    conn.executemany(
+        'INSERT INTO alert_events(alert_id, triggered_at, observed_value, date) VALUES (?,?,?,?)',
+        [(aid, f'2026-01-{d:02d}T00:00:00+00:00', float(d), f'2024-01-{d:02d}') for d in range(1, 8)],
+    )
+    pages = []
+    cursor = None
+    while True:
+        page = list_alert_events(conn, 'KEN', limit=3, before=cursor)
+        if not page:
+            break
+        pages.append([e['observed_value'] for e in page])
+        cursor = (page[-1]['triggered_at'], page[-1]['event_id'])
+    assert pages == [[7.0, 6.0, 5.0], [4.0, 3.0, 2.0], [1.0]]
+
+
+def test_init_db_adds_rule_columns_to_existing_alerts_table():
+    conn = get_connection(':memory:')
+    conn.execute(
+        'CREATE TABLE alerts(alert_id INTEGER PRIMARY KEY AUTOINCREMENT, country_iso3 TEXT NOT NULL, '
+        'indicator_id TEXT NOT NULL, direction TEXT NOT NULL, threshold REAL NOT NULL, created_at TEXT NOT NULL)'
+    )
+    conn.execute("INSERT INTO alerts(country_iso3, indicator_id, direction, threshold, created_at) VALUES ('KEN','inflation','above',1,'x')")
+    init_db(conn)
+    row = conn.execute('SELECT kind, periods FROM alerts').fetchone()
+    assert (row['kind'], row['periods']) == ('threshold', 1)
+
+
 def test_ingest_country_demo_mode():
     conn = get_connection(':memory:')
     init_db(conn)
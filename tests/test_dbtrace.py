@@ -0,0 +1,41 @@
+from src.dbtrace import QueryStats, TracingConnection, normalize_sql
+from src.db import get_connection, init_db, query_country_values
+from src.ingest import ingest_country
+
+
+def traced_conn(slow_ms=10_000.0):
+    conn = get_connection(':memory:', trace=True)
+    conn.trace_stats = QueryStats()
+    conn.slow_query_ms = slow_ms
+    init_db(conn)
+    return conn
+
+
+def test_normalize_sql_strips_literals_and_whitespace():
+    assert normalize_sql("SELECT *\n  FROM t WHERE a = 'KEN' AND b > 12.5") == 'SELECT * FROM t WHERE a = ? AND b > ?'
+
+
+def test_tracing_records_calls_and_rows():
+    conn = traced_conn()
+    assert isinstance(conn, TracingConnection)
+    ingest_country(conn, 'KEN', demo_mode=True)
+    rows = query_country_values(conn, 'KEN')
+    assert len(rows) == 84
+    top = conn.trace_stats.top(50)
+    select = next(e for e in top if 'FROM dim_country c' in e['sql'])
+    assert select['calls'] == 1 and select['rows'] == 84
+    upsert = next(e for e in top if e['sql'].startswith('INSERT INTO value_facts'))
+    assert upsert['rows'] == 84
+
+
+def test_slow_queries_capture_plan():
+    conn = traced_conn(slow_ms=0.0)
+    ingest_country(conn, 'KEN', demo_mode=True)
+    query_country_values(conn, 'KEN')
+    slow = [s for s in conn.trace_stats.slow if 'FROM dim_country c' in s['sql']]
+    assert slow and slow[-1]['plan']
+
+
+def test_tracing_disabled_by_default(monkeypatch):
+    monkeypatch.delenv('APP_DB_TRACE', raising=False)
+    assert not isinstance(get_connection(':memory:'), TracingConnection)
@@ -0,0 +1,38 @@
+import pandas as pd
+
+from src.downsample import downsample_minmax
+
+
+def make_frame(n, indicators=('a', 'b')):
+    dates = pd.date_range('2000-01-01', periods=n, freq='D')
+    frames = []
+    for k, iid in enumerate(indicators):
+        values = [float((i * 7 + k) % 13) for i in range(n)]
+        frames.append(pd.DataFrame({'date': dates, 'indicator_id': iid, 'value': values}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_small_series_pass_through():
+    df = make_frame(50)
+    out = downsample_minmax(df, max_points=100)
+    assert len(out) == len(df)
+
+
+def test_caps_points_per_series_and_keeps_peaks():
+    df = make_frame(10_000)
+    df.loc[(df['indicator_id'] == 'a') & (df.index == 4321), 'value'] = 999.0
+    out = downsample_minmax(df, max_points=200)
+    counts = out.groupby('indicator_id').size()
+    assert (counts <= 200).all()
+    assert out['value'].max() == 999.0
+    for _, series in out.groupby('indicator_id'):
+        assert series['date'].is_monotonic_increasing
+        assert series['date'].iloc[0] == df['date'].min()
+        assert series['date'].iloc[-1] == df['date'].max()
+
+
+def test_single_series_without_group():
+    trend = pd.DataFrame({'date': pd.date_range('2000-01-01', periods=5000), 'overall_risk': range(5000)})
+    out = downsample_minmax(trend, y='overall_risk', group=None, max_points=100)
+    assert len(out) <= 100
+    assert out['overall_risk'].iloc[-1] == 4999
@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+
+from src.db import get_connection, init_db
+from src.export import export_file_name, export_values, iter_export_chunks
+from src.ingest import ingest_country
+
+
+def setup_conn():
+    conn = get_connection(':memory:')
+    init_db(conn)
+    ingest_country(conn, 'KEN', demo_mode=True)
+    ingest_country(conn, 'SDN', demo_mode=True)
+    return conn
+
+
+def test_iter_export_chunks_respects_chunk_size():
+    conn = setup_conn()
+    chunks = list(iter_export_chunks(conn, countries=['KEN', 'SDN'], chunk_size=50))
+    assert all(len(c) <= 50 for c in chunks)
+    assert sum(len(c) for c in chunks) == 168
+
+
+def test_iter_export_chunks_filters():
+    conn = setup_conn()
+    rows = [r for c in iter_export_chunks(conn, countries=['KEN'], indicators=['inflation'], start_date='2024-06-01') for r in c]
+    assert rows
+    assert {r['country_iso3'] for r in rows} == {'KEN'}
+    assert {r['indicator_id'] for r in rows} == {'inflation'}
+    assert min(r['date'] for r in rows) >= '2024-06-01'
+
+
+def test_export_csv_and_ndjson_row_counts():
+    conn = setup_conn()
+    buf = io.BytesIO()
+    assert export_values(conn, buf, 'csv', countries=['KEN']) == 84
+    assert len(list(csv.DictReader(io.StringIO(buf.getvalue().decode('utf-8'))))) == 84
+
+    buf = io.BytesIO()
+    export_values(conn, buf, 'ndjson', chunk_size=7)
+    lines = buf.getvalue().decode('utf-8').splitlines()
+    assert len(lines) == 168
+    assert json.loads(lines[0])['country_iso3'] == 'KEN'
+
+
+def test_export_file_name():
+    assert export_file_name(['SDN', 'KEN'], 'csv') == 'ken_sdn_export.csv'
+    assert export_file_name(None, 'parquet') == 'all_countries_export.parquet'
+
+
+def test_filtered_exports_stream_without_temp_btree():
+    conn = setup_conn()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    cases = [
+        {'countries': ['KEN', 'SDN']},
+        {'countries': ['KEN', 'SDN'], 'start_date': '2020-01-01', 'end_date': '2024-06-01'},
+        {'start_date': '2020-01-01'},
+        {'indicators': ['inflation'], 'start_date': '2020-01-01'},
+        {'countries': ['SDN', 'KEN'], 'indicators': ['inflation', 'gdp_growth'], 'end_date': '2024-06-01'},
+    ]
+    for analyzed in (False, True):
+        if analyzed:
+            conn.execute('ANALYZE')
+        for kwargs in cases:
+            statements.clear()
+            rows = [r for c in iter_export_chunks(conn, **kwargs) for r in c]
+            assert rows
+            keys = [(r['country_iso3'], r['indicator_id'], r['date']) for r in rows]
+            assert [k[0] for k in keys] == sorted(k[0] for k in keys)
+            query = next(s for s in statements if 'FROM value_facts f' in s)
+            plan = ' | '.join(r[3] for r in conn.execute(f'EXPLAIN QUERY PLAN {query}'))
+            assert 'TEMP B-TREE' not in plan, (kwargs, plan)
+    assert list(iter_export_chunks(conn, countries=['XXX'], start_date='2020-01-01')) == []
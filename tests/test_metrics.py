@@ -0,0 +1,57 @@
+import json
+
+from src import metrics
+from src.db import get_connection, init_db
+from src.ingest import ingest_country
+from src.scoring import compute_scores, score_trend
+
+
+def test_timers_and_counters_snapshot():
+    metrics.reset()
+    metrics.incr('cache.hit')
+    metrics.incr('cache.hit', 2)
+    with metrics.timed('stage'):
+        pass
+    snap = metrics.snapshot()
+    assert snap['counters']['cache.hit'] == 3
+    assert snap['timers']['stage']['count'] == 1
+    assert json.loads(metrics.to_json(snap))['counters'] == {'cache.hit': 3}
+
+
+def test_prometheus_text_names_are_sanitized():
+    metrics.reset()
+    metrics.incr('db.upsert_values.rows', 5)
+    metrics.observe('render.dashboard', 0.25)
+    text = metrics.to_prometheus()
+    assert 'food_security_db_upsert_values_rows_total 5' in text
+    assert 'food_security_render_dashboard_seconds_count 1' in text
+
+
+def test_prometheus_counters_keep_full_precision():
+    metrics.reset()
+    metrics.incr('fetch.bytes', 12345678)
+    metrics.incr('fetch.ratio', 0.125)
+    text = metrics.to_prometheus()
+    assert 'food_security_fetch_bytes_total 12345678\n' in text
+    assert 'food_security_fetch_ratio_total 0.125\n' in text
+
+
+def test_ingestion_records_upsert_rows():
+    metrics.reset()
+    conn = get_connection(':memory:')
+    init_db(conn)
+    ingest_country(conn, 'KEN', demo_mode=True)
+    snap = metrics.snapshot()
+    assert snap['counters']['db.upsert_values.rows'] == 84
+    assert snap['timers']['ingest.country']['count'] == 1
+
+
+def test_compute_scores_is_timed_once_per_call():
+    metrics.reset()
+    rows = [
+        {'indicator_id': 'inflation', 'date': f'2024-0{m}-01', 'value': float(m), 'category': 'macro'}
+        for m in range(1, 7)
+    ]
+    compute_scores(rows, rows[-1:])
+    score_trend(rows)
+    assert metrics.snapshot()['timers']['scoring.compute_scores']['count'] == 1
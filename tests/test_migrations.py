@@ -0,0 +1,105 @@
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src import db
+from src.db import SCHEMA_VERSION, get_connection, get_schema_version, init_db, query_country_values, upsert_values
+
+LEGACY_SCHEMA = """
+CREATE TABLE indicators_meta(
+    indicator_id TEXT PRIMARY KEY, indicator_name TEXT NOT NULL, category TEXT NOT NULL,
+    unit TEXT NOT NULL, source TEXT NOT NULL, source_url TEXT NOT NULL
+);
+CREATE TABLE indicators_values(
+    country_iso3 TEXT NOT NULL, date TEXT NOT NULL, indicator_id TEXT NOT NULL, value REAL NOT NULL,
+    unit TEXT NOT NULL, source TEXT NOT NULL, last_updated TEXT NOT NULL,
+    PRIMARY KEY(country_iso3, date, indicator_id)
+);
+CREATE TABLE alerts(
+    alert_id INTEGER PRIMARY KEY AUTOINCREMENT, country_iso3 TEXT NOT NULL, indicator_id TEXT NOT NULL,
+    direction TEXT NOT NULL, threshold REAL NOT NULL, created_at TEXT NOT NULL
+);
+INSERT INTO indicators_meta VALUES ('inflation', 'Inflation', 'macro', '%', 'World Bank', 'x');
+INSERT INTO indicators_values VALUES ('KEN', '2024-02-01', 'inflation', 7.5, '%', 'World Bank', '2026-01-01T00:00:00Z');
+INSERT INTO indicators_values VALUES ('KEN', '2024-01-01', 'inflation', 6.5, '%', 'Demo', '2026-01-01T00:00:00Z');
+INSERT INTO indicators_values VALUES ('SDN', '2024-01-01', 'inflation', 60.0, '%', 'Demo', '2026-01-01T00:00:00Z');
+"""
+
+
+def test_fresh_database_is_at_latest_version():
+    conn = get_connection(':memory:')
+    init_db(conn)
+    init_db(conn)
+    assert get_schema_version(conn) == SCHEMA_VERSION
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")}
+    assert {'value_facts', 'dim_country', 'dim_indicator', 'dim_source', 'indicators_values'} <= tables
+
+
+def test_legacy_database_migrates_in_place(tmp_path):
+    path = tmp_path / 'legacy.db'
+    legacy = sqlite3.connect(path)
+    legacy.executescript(LEGACY_SCHEMA)
+    legacy.close()
+
+    conn = get_connection(path)
+    init_db(conn)
+    assert get_schema_version(conn) == SCHEMA_VERSION
+    rows = [dict(r) for r in query_country_values(conn, 'KEN')]
+    assert rows == [
+        {'country_iso3': 'KEN', 'date': '2024-01-01', 'indicator_id': 'inflation', 'value': 6.5, 'unit': '%', 'source': 'Demo', 'category': 'macro'},
+        {'country_iso3': 'KEN', 'date': '2024-02-01', 'indicator_id': 'inflation', 'value': 7.5, 'unit': '%', 'source': 'World Bank', 'category': 'macro'},
+    ]
+    view_row = conn.execute("SELECT * FROM indicators_values WHERE country_iso3 = 'SDN'").fetchone()
+    assert dict(view_row)['last_updated'] == '2026-01-01T00:00:00Z'
+    assert conn.execute('SELECT kind FROM alerts').fetchall() == []
+
+
+def test_upserts_and_view_inserts_share_dictionaries():
+    conn = get_connection(':memory:')
+    init_db(conn)
+    row = {
+        'country_iso3': 'KEN', 'date': '2024-01-01', 'indicator_id': 'inflation', 'value': 1.0,
+        'unit': '%', 'source': 'x', 'last_updated': '2026-01-01T00:00:00Z',
+    }
+    upsert_values(conn, [row])
+    upsert_values(conn, [{**row, 'value': 2.0}])
+    conn.execute(
+        'INSERT INTO indicators_values VALUES (:country_iso3,:date,:indicator_id,:value,:unit,:source,:last_updated)',
+        {**row, 'date': '2024-02-01', 'value': 3.0},
+    )
+    assert conn.execute('SELECT COUNT(*) FROM dim_country').fetchone()[0] == 1
+    assert [r['value'] for r in conn.execute('SELECT value FROM indicators_values ORDER BY date')] == [2.0, 3.0]
+
+
+def test_concurrent_processes_migrate_once(tmp_path):
+    path = tmp_path / 'legacy.db'
+    legacy = sqlite3.connect(path)
+    legacy.executescript(LEGACY_SCHEMA)
+    legacy.close()
+
+    script = 'import sys; from src.db import get_connection, init_db; init_db(get_connection(sys.argv[1]))'
+    root = Path(__file__).resolve().parents[1]
+    procs = [subprocess.Popen([sys.executable, '-c', script, str(path)], cwd=root, stderr=subprocess.PIPE) for _ in range(4)]
+    errors = [p.communicate()[1].decode() for p in procs]
+    assert [p.returncode for p in procs] == [0, 0, 0, 0], errors
+    conn = get_connection(path)
+    assert get_schema_version(conn) == SCHEMA_VERSION
+    assert len(query_country_values(conn, 'KEN')) == 2
+
+
+def test_failed_migration_leaves_version_unchanged(monkeypatch):
+    conn = get_connection(':memory:')
+
+    def broken(conn):
+        conn.execute('CREATE TABLE half_done(x)')
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr('src.db.MIGRATIONS', [db.MIGRATIONS[0], broken])
+    monkeypatch.setattr('src.db.SCHEMA_VERSION', 2)
+    with pytest.raises(RuntimeError):
+        init_db(conn)
+    assert get_schema_version(conn) == 1
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'half_done'").fetchone()[0] == 0
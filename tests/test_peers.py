@@ -0,0 +1,56 @@
+from src.db import get_connection, init_db
+from src.ingest import ingest_country
+from src.peers import PeerIndex
+from src.scoring import compute_scores, score_trend
+
+
+def row(country, value, date='2024-01-01', indicator='inflation'):
+    return {'country_iso3': country, 'indicator_id': indicator, 'date': date, 'value': value, 'category': 'macro'}
+
+
+def test_percentile_rank_uses_peers_on_same_date():
+    index = PeerIndex()
+    index.update([row('AAA', 1), row('BBB', 2), row('CCC', 3), row('DDD', 4), row('AAA', 99, date='2023-01-01')])
+    assert index.percentile('inflation', '2024-01-01', 4) == 87.5
+    assert index.percentile('inflation', '2024-01-01', 1) == 12.5
+    assert index.percentile('inflation', '2022-01-01', 1) is None
+
+
+def test_update_replaces_country_value():
+    index = PeerIndex()
+    index.update([row('AAA', 1), row('BBB', 2)])
+    index.update([row('AAA', 3)])
+    assert index.peer_count('inflation', '2024-01-01') == 2
+    assert index.percentile('inflation', '2024-01-01', 3) == 75.0
+
+
+def test_ingestion_updates_index_and_scores_use_it():
+    conn = get_connection(':memory:')
+    init_db(conn)
+    index = PeerIndex.from_db(conn)
+    for iso in ('KEN', 'SDN', 'YEM'):
+        ingest_country(conn, iso, demo_mode=True, peer_index=index)
+    assert index.peer_count('inflation', '2024-12-01') == 3
+    rebuilt = PeerIndex.from_db(conn)
+    assert rebuilt.percentile('inflation', '2024-12-01', 10.0) == index.percentile('inflation', '2024-12-01', 10.0)
+
+    rows = [row('KEN', 5), row('KEN', 50, date='2024-02-01')]
+    peers = PeerIndex()
+    peers.update([row('SDN', 10, date='2024-02-01'), row('KEN', 50, date='2024-02-01')])
+    out = compute_scores(rows, [rows[-1]], peer_index=peers)
+    assert out['normalized_inputs']['inflation'] == 75.0
+    assert score_trend(rows, peer_index=peers)[-1][1] == out['overall_risk']
+
+
+def test_deferred_index_loads_on_first_lookup(tmp_path):
+    db_path = tmp_path / 'food.db'
+    conn = get_connection(db_path)
+    init_db(conn)
+    ingest_country(conn, 'KEN', demo_mode=True)
+    index = PeerIndex.deferred(db_path)
+    ingest_country(conn, 'SDN', demo_mode=True, peer_index=index)
+    assert not index.loaded
+    assert index.peer_count('inflation', '2024-12-01') == 2
+    assert index.loaded
+    ingest_country(conn, 'YEM', demo_mode=True, peer_index=index)
+    assert index.peer_count('inflation', '2024-12-01') == 3
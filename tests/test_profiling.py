@@ -0,0 +1,39 @@
+import pstats
+import time
+
+from src.profiling import RerunProfiler, save_profile
+
+
+def busy_work(seconds=0.05):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(200))
+    return total
+
+
+def test_profile_captures_pstats_and_collapsed_stacks(tmp_path):
+    profiler = RerunProfiler(interval_s=0.001).start()
+    busy_work()
+    result = save_profile(profiler.stop(), label='dashboard/KEN', directory=tmp_path)
+
+    assert result['label'] == 'dashboard/KEN'
+    assert result['samples'] > 0
+    assert any(row['function'].startswith('busy_work (test_profiling.py') for row in result['top'])
+    stats = pstats.Stats(result['pstats_path'])
+    assert stats.total_calls > 0
+    with open(result['collapsed_path'], encoding='utf-8') as fp:
+        lines = fp.read().splitlines()
+    assert any('busy_work (test_profiling.py' in line for line in lines)
+    stack, count = lines[0].rsplit(' ', 1)
+    assert ';' in stack and int(count) > 0
+    assert result['collapsed_path'].endswith('_dashboard_KEN.collapsed')
+
+
+def test_old_profiles_are_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr('src.profiling.PROFILE_KEEP', 2)
+    for _ in range(4):
+        save_profile(RerunProfiler().start().stop(), directory=tmp_path)
+        time.sleep(0.001)
+    assert len(list(tmp_path.glob('*.collapsed'))) == 2
+    assert len(list(tmp_path.glob('*.pstats'))) == 2
@@ -0,0 +1,73 @@
+import sqlite3
+
+from src.db import get_connection, get_latest_ingestion_run, init_db, query_country_values
+from src.ingest import ingest_country
+from src.snapshot import build_snapshot, seed_from_snapshot
+
+
+def _boom(*args, **kwargs):
+    raise AssertionError('live source should not be called')
+
+
+def test_build_snapshot_is_analyzed_and_migrated(tmp_path):
+    result = build_snapshot(tmp_path / 'snap.db', countries=['KEN', 'SDN'], demo_mode=True)
+    assert result['countries'] == {'KEN': 'demo', 'SDN': 'demo'}
+    conn = sqlite3.connect(result['path'])
+    assert conn.execute('PRAGMA user_version').fetchone()[0] >= 2
+    assert conn.execute('SELECT COUNT(*) FROM sqlite_stat1').fetchone()[0] > 0
+    assert not (tmp_path / 'snap.db.partial').exists()
+
+
+def test_seeded_database_skips_first_ingestion(tmp_path, monkeypatch):
+    monkeypatch.setattr('src.ingest.fetch_world_bank', lambda *a, **k: [])
+    monkeypatch.setattr('src.ingest.fetch_food_source', lambda *a, **k: [])
+    snap = build_snapshot(tmp_path / 'snap.db', countries=['KEN'])['path']
+    db_path = tmp_path / 'app' / 'food.db'
+    assert seed_from_snapshot(db_path, snap)
+    assert not seed_from_snapshot(db_path, snap)
+
+    monkeypatch.setattr('src.ingest.fetch_world_bank', _boom)
+    monkeypatch.setattr('src.ingest.fetch_food_source', _boom)
+    monkeypatch.setattr('src.ingest.upsert_values', _boom)
+    conn = get_connection(db_path)
+    init_db(conn)
+    assert ingest_country(conn, 'KEN', demo_mode=False, reuse_fresh=True) == 'snapshot:live'
+    assert get_latest_ingestion_run(conn, 'KEN')['mode'] == 'snapshot:live'
+    assert query_country_values(conn, 'KEN')
+
+
+def test_demo_built_snapshot_is_not_served_as_live(tmp_path, monkeypatch):
+    def _outage(*args, **kwargs):
+        raise RuntimeError('upstream down')
+
+    monkeypatch.setattr('src.ingest.fetch_world_bank', _outage)
+    snap = build_snapshot(tmp_path / 'snap.db', countries=['KEN', 'SDN'])
+    assert snap['countries'] == {'KEN': 'fallback_demo', 'SDN': 'fallback_demo'}
+    db_path = tmp_path / 'food.db'
+    assert seed_from_snapshot(db_path, snap['path'])
+
+    conn = get_connection(db_path)
+    init_db(conn)
+    assert get_latest_ingestion_run(conn, 'KEN')['mode'] == 'snapshot:fallback_demo'
+    assert ingest_country(conn, 'KEN', demo_mode=True, reuse_fresh=True) == 'snapshot:fallback_demo'
+    monkeypatch.setattr('src.ingest.fetch_world_bank', lambda *a, **k: [])
+    monkeypatch.setattr('src.ingest.fetch_food_source', lambda *a, **k: [])
+    assert ingest_country(conn, 'KEN', demo_mode=False, reuse_fresh=True) == 'live'
+
+
+def test_reuse_fresh_only_reuses_compatible_modes(monkeypatch):
+    conn = get_connection(':memory:')
+    init_db(conn)
+    assert ingest_country(conn, 'KEN', demo_mode=True, reuse_fresh=True) == 'demo'
+    assert ingest_country(conn, 'KEN', demo_mode=True, reuse_fresh=True) == 'demo'
+    assert get_latest_ingestion_run(conn, 'KEN')['mode'] == 'demo'
+    assert conn.execute('SELECT COUNT(*) FROM ingestion_runs').fetchone()[0] == 1
+
+    monkeypatch.setattr('src.ingest.fetch_world_bank', lambda *a, **k: [])
+    monkeypatch.setattr('src.ingest.fetch_food_source', lambda *a, **k: [])
+    assert ingest_country(conn, 'KEN', demo_mode=False, reuse_fresh=True) == 'live'
+
+
+def test_seed_without_snapshot_is_noop(tmp_path):
+    assert not seed_from_snapshot(tmp_path / 'food.db', tmp_path / 'missing.db')
+    assert not (tmp_path / 'food.db').exists()
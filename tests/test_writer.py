@@ -0,0 +1,103 @@
+import sqlite3
+import threading
+
+import pytest
+
+from src.alerts import add_alert_rule, list_alert_events
+from src.db import get_connection, get_latest_ingestion_run, query_country_values
+from src.ingest import ingest_country
+from src.scenarios import record_scenario
+from src.writer import DbWriter
+
+
+@pytest.fixture
+def writer(tmp_path):
+    w = DbWriter(tmp_path / 'food.db', max_delay_s=0.01).start()
+    yield w
+    w.close()
+
+
+def test_call_returns_result_after_commit(writer):
+    alert_id = writer.call(add_alert_rule, 'KEN', 'inflation', 'above', 5.0)
+    reader = get_connection(writer.db_path)
+    assert reader.execute('SELECT alert_id FROM alerts').fetchone()[0] == alert_id
+    assert list_alert_events(reader, 'KEN') == []
+    assert reader.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+
+def test_concurrent_jobs_share_group_commits(writer):
+    ids = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(25):
+            scenario_id = writer.call(record_scenario, 'KEN', 'conflict_spike', 0.5, 12)
+            with lock:
+                ids.append(scenario_id)
+
+    futures = [writer.submit(record_scenario, 'SDN', 'currency_depreciation', 0.1, 6) for _ in range(100)]
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ids.extend(f.result() for f in futures)
+    assert sorted(ids) == list(range(1, 201))
+    assert writer.jobs == 200
+    assert writer.commits < writer.jobs
+
+
+def test_failed_job_only_rolls_back_itself(writer):
+    def broken(conn):
+        conn.execute("INSERT INTO scenarios(country_iso3, shock_type, severity, horizon, created_at) VALUES ('KEN','x',1,1,'t')")
+        raise ValueError('boom')
+
+    ok = writer.submit(record_scenario, 'KEN', 'conflict_spike', 0.5, 12)
+    bad = writer.submit(broken)
+    with pytest.raises(ValueError):
+        bad.result()
+    assert ok.result() == 1
+    reader = get_connection(writer.db_path)
+    assert reader.execute('SELECT COUNT(*) FROM scenarios').fetchone()[0] == 1
+
+
+def test_ingest_country_writes_through_writer(writer):
+    reader = get_connection(writer.db_path)
+    assert ingest_country(reader, 'KEN', demo_mode=True, writer=writer) == 'demo'
+    assert query_country_values(reader, 'KEN')
+    assert get_latest_ingestion_run(reader, 'KEN')['mode'] == 'demo'
+    assert reader.in_transaction is False
+
+
+def _lock_database(db_path):
+    blocker = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+    blocker.execute('BEGIN IMMEDIATE')
+    return blocker
+
+
+def test_locked_database_fails_the_batch_and_writer_keeps_running(tmp_path):
+    writer = DbWriter(tmp_path / 'food.db', busy_timeout_s=0.01, busy_retries=1).start()
+    try:
+        blocker = _lock_database(writer.db_path)
+        with pytest.raises(sqlite3.OperationalError, match='locked'):
+            writer.call(record_scenario, 'KEN', 'conflict_spike', 0.5, 12, timeout=5)
+        blocker.execute('ROLLBACK')
+        blocker.close()
+        assert writer.failed_batches == 1
+        assert writer.call(record_scenario, 'KEN', 'conflict_spike', 0.5, 12, timeout=5) == 1
+    finally:
+        writer.close()
+
+
+def test_busy_database_is_retried_until_the_lock_is_released(tmp_path):
+    writer = DbWriter(tmp_path / 'food.db', busy_timeout_s=0.01, busy_retries=5).start()
+    try:
+        blocker = _lock_database(writer.db_path)
+        release = threading.Timer(0.1, lambda: blocker.execute('ROLLBACK'))
+        release.start()
+        assert writer.call(record_scenario, 'KEN', 'conflict_spike', 0.5, 12, timeout=5) == 1
+        release.join()
+        blocker.close()
+        assert writer.failed_batches == 0
+    finally:
+        writer.close()